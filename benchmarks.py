@@ -0,0 +1,532 @@
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tracemalloc
+from contextlib import redirect_stdout
+from io import BytesIO
+from time import perf_counter_ns as time
+
+import main
+import relay_tools
+import split_model
+import swimmer_registry
+import synthetic_data
+
+def bench_html_vs_pdf(folder=main.pdf_folder_name, repeats=3):
+    """Times the direct HTML parser against the HTML->PDF->text path on the same saved pages."""
+    files = sorted(f for f in os.listdir(folder) if f.endswith(".html")) if os.path.isdir(folder) else []
+    if not files:
+        print(f"No saved .html result pages in {folder}. Run a download with use_html_parser = True first.")
+        return
+
+    html_total = 0
+    pdf_total = 0
+    for file in files:
+        with open(f"{folder}/{file}", 'r', encoding='utf-8') as f:
+            html = f.read()
+
+        st = time()
+        for _ in range(repeats):
+            html_result = main.extractTimes(*main.readHTMLResults(html))
+        html_ns = (time() - st) / repeats
+
+        st = time()
+        for _ in range(repeats):
+            pdf = main.renderPdf(html)
+            pdf_result = main.extractTimes(*main.readPDFFile(BytesIO(pdf)))
+        pdf_ns = (time() - st) / repeats
+
+        html_total += html_ns
+        pdf_total += pdf_ns
+        match = "same" if html_result == pdf_result else "DIFFERENT"
+        print(f"{file}: html {html_ns / 1_000_000:.2f} ms, pdf {pdf_ns / 1_000_000:.2f} ms ({match} output)")
+
+    print(f"\nTotal: html {html_total / 1_000_000:.2f} ms, pdf {pdf_total / 1_000_000:.2f} ms "
+          f"({pdf_total / max(html_total, 1):.1f}x)")
+
+def naive_merge(eventName, csvData, times):
+    """The pre-index writeEventToCSV loop, kept here as the baseline to compare against."""
+    eventIndex = csvData[0].index(eventName)
+    for entry in times:
+        for row in csvData:
+            if entry[0] == row[0]:
+                formattedTime = main.normalize_duration(entry[1])
+                if row[eventIndex] == '' or main.parse_duration(formattedTime) < main.parse_duration(row[eventIndex]):
+                    row[eventIndex] = formattedTime
+                break
+
+def bench_merge(swimmers=10_000, seed=1):
+    """Merges a result batch for every event into a sheet of `swimmers` rows."""
+    rng = random.Random(seed)
+    header = main.cleanUpCSV([], [])[0]
+    names = [f"Swimmer {i:05}" for i in range(swimmers)]
+    csvData = [header] + [[name, "3B"] + [''] * (len(header) - 2) for name in names]
+    batches = [
+        (event, [[name, f"{rng.randint(25, 200)}.{rng.randint(0, 99):02}"] for name in rng.sample(names, swimmers // 2)])
+        for event in header[2:]
+    ]
+
+    st = time()
+    roster = [[name, "3B"] for name in names]
+    batches = [(event, main.sanitize_entries(race, roster)) for event, race in batches]
+    sanitize_ns = time() - st
+
+    st = time()
+    table = main.BestTimeTable(csvData)
+    for event, race in batches:
+        main.writeEventToCSV(event, csvData, race, table=table)
+    merge_ns = time() - st
+
+    sample = min(swimmers, 2_000)
+    naive_rows = [header] + [row[:2] + [''] * (len(header) - 2) for row in csvData[1:sample + 1]]
+    naive_times = [t for t in batches[0][1] if t[0] in {row[0] for row in naive_rows}]
+    st = time()
+    naive_merge(batches[0][0], naive_rows, naive_times)
+    naive_ns = time() - st
+
+    print(f"{swimmers} swimmers, {len(batches)} events, {sum(len(b[1]) for b in batches)} times")
+    print(f"sanitize_entries: {sanitize_ns / 1_000_000:.2f} ms")
+    print(f"indexed merge (all events): {merge_ns / 1_000_000:.2f} ms")
+    print(f"nested-loop merge (1 event, {sample} swimmers): {naive_ns / 1_000_000:.2f} ms")
+
+def bench_medley(sizes=(8, 16, 24, 32, 40, 100, 250, 500), brute_force_limit=40, seed=1):
+    """Times the assignment-based medley solver against the itertools.product brute force."""
+    rng = random.Random(seed)
+    for n in sizes:
+        times = [(f"Swimmer {i}", [rng.randint(2800, 5500) if rng.random() > 0.2 else None for _ in range(4)])
+                 for i in range(n)]
+
+        st = time()
+        _, fast_sum = relay_tools.find_minimum_sum_combination(times)
+        fast_ns = time() - st
+
+        if n <= brute_force_limit:
+            st = time()
+            _, brute_sum = relay_tools.find_minimum_sum_combination_bruteforce(times)
+            brute_ns = time() - st
+            brute = f"brute force {brute_ns / 1_000_000:9.2f} ms ({'same' if brute_sum == fast_sum else 'DIFFERENT'} optimum)"
+        else:
+            brute = "brute force skipped"
+        print(f"{n:4} swimmers: assignment {fast_ns / 1_000_000:7.2f} ms, {brute}")
+
+def bench_meet(sizes=(300, 1_000, 5_000), relays_per_event=(1, 3), max_relays_per_swimmer=2, seed=1):
+    """Times planning every relay of a meet (a medley and a freestyle event per division) on synthetic clubs."""
+    for swimmers in sizes:
+        sheet = synthetic_data.make_time_sheet(synthetic_data.make_roster(swimmers, seed), seed)
+        splits = relay_tools.SplitTable(sheet, split_model.load_split_model(sheet, path=""))
+        for count in relays_per_event:
+            events = relay_tools.meet_events(splits, count)
+            st = time()
+            plan = relay_tools.plan_meet_relays(splits, events, max_relays_per_swimmer)
+            elapsed = time() - st
+            filled = sum(len(relays) for _, _, relays in plan)
+            print(f"{swimmers:5} swimmers, {count} relay(s) per event: filled {filled:3} of {len(events) * count:3} "
+                  f"in {elapsed / 1_000_000:9.2f} ms")
+
+def bench_fuzzy(roster_size=5_000, queries=500, seed=1):
+    """Times indexed name lookups against a large synthetic roster, including typo'd names."""
+    rng = random.Random(seed)
+    roster = synthetic_data.make_roster(roster_size, seed)
+
+    st = time()
+    index = relay_tools.NameIndex(roster)
+    build_ns = time() - st
+
+    lookups = []
+    for _ in range(queries):
+        name = list(rng.choice(roster)[0].lower())
+        name[rng.randrange(len(name))] = rng.choice("xyzq")
+        lookups.append("".join(name))
+
+    st = time()
+    for name in lookups:
+        relay_tools.name_fuzzy_search(name, index)
+    search_ns = (time() - st) / queries
+
+    print(f"{roster_size} names: index built in {build_ns / 1_000_000:.2f} ms, "
+          f"{search_ns / 1_000_000:.3f} ms per fuzzy lookup")
+
+def naive_pdf_lines(pages):
+    """The pre-streaming readPDFFile text handling, kept here as the baseline to compare against."""
+    parts = ""
+    for page in pages:
+        parts += page
+    output = []
+    for line in "".join(parts).split("\n"):
+        if len(line) > 0 and line[0].isnumeric():
+            output.append(line)
+        if line[:4] == "Fema" or line[:4] == "Male":
+            output.insert(0, line)
+    output = [i.strip() for i in output]
+    return output[0], output[1:]
+
+def synthetic_pages(results, lines_per_page=45):
+    """Yields result text one page at a time, repeating the event header on every page like the PDFs do."""
+    lines = synthetic_data.make_result_lines("100FR", "Male", synthetic_data.make_roster(results * 2, 1), entered=1.0)
+    for start in range(1, len(lines), lines_per_page):
+        yield "\n".join([lines[0], "Team Results", *lines[start:start + lines_per_page]]) + "\n"
+
+def bench_pdf_text(sizes=(1_000, 10_000, 100_000), repeats=3):
+    """Times and memory-profiles the text side of readPDFFile on large multi-page results.
+
+    Page text is generated, so this runs without pypdf; with pypdf and WeasyPrint
+    installed, a rendered PDF of the smallest size is decoded end to end as well.
+    """
+    for results in sizes:
+        pages = list(synthetic_pages(results))
+        row = {}
+        for label, run in [("concatenate", lambda: naive_pdf_lines(iter(pages))),
+                           ("streaming", lambda: main.filterResultLines(main.textLines(iter(pages))))]:
+            best = None
+            for _ in range(repeats):
+                st = time()
+                out = run()
+                elapsed = time() - st
+                best = elapsed if best is None else min(best, elapsed)
+            tracemalloc.start()
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            row[label] = (best / 1_000_000, peak / 1_048_576, out)
+        # The baseline keeps every repeated header line, so compare what extractTimes makes of each.
+        same = "same" if main.extractTimes(*row["concatenate"][2]) == main.extractTimes(*row["streaming"][2]) else "DIFFERENT"
+        print(f"{results} results on {len(pages)} pages: "
+              + ", ".join(f"{label} {ms:.1f} ms / {mb:.1f} MiB peak" for label, (ms, mb, _) in row.items())
+              + f" ({same} times)")
+    
+    skip = pdf_support()
+    if skip is not None:
+        print(f"End-to-end PDF decode {skip}.")
+        return
+    lines = synthetic_data.make_result_lines("100FR", "Male", synthetic_data.make_roster(sizes[0] * 2, 1), entered=1.0)
+    pdf = main.renderPdf(synthetic_data.make_result_page(lines))
+    st = time()
+    header, found = main.readPDFFile(BytesIO(pdf))
+    print(f"End-to-end readPDFFile on {len(pdf) // 1024} KiB PDF: {(time() - st) / 1_000_000:.1f} ms, {len(found)} lines")
+
+# The result line regex extractTimes used before tokenizeResultLine, kept as the reference to match.
+reference_line_pattern = re.compile(
+    r"^\s*\d+\s*([a-zA-Z\-' ()]+?),\s*([a-zA-Z\-' ()]+?)(?=\s?\d+)\s*\w+\s*(\d{0,2}:?\d{2}\.\d{2}).*$"
+)
+
+def reference_tokens(line):
+    result = reference_line_pattern.search(line)
+    return result.groups() if result else None
+
+def reference_event(header):
+    """The pre-tokenizer header walk of extractTimes, kept as the baseline to compare against."""
+    firstline = header.strip()
+    if "Female" in firstline:
+        firstline = firstline[7:-6]
+    elif "Male" in firstline:
+        firstline = firstline[5:-6]
+    else:
+        return None
+    event = ""
+    i = len(firstline) - 1
+    while i >= 0:
+        if firstline[i].isnumeric() or firstline[i] == " ":
+            break
+        event = firstline[i] + event
+        i -= 1
+    shorthand = {"Free": "FR", "Back": "BK", "Fly": "FL", "Breast": "BR", "IM": "IM"}.get(event)
+    return firstline[0:i].strip() + shorthand if shorthand else None
+
+def parsed_event(header):
+    try:
+        return main.parseEventHeader(header)
+    except Exception:
+        return None
+
+# Characters that steer the regex: digits, separators, name characters, other whitespace and non-ASCII digits and letters.
+fuzz_alphabet = list("0123456789 ,.:-'()aZbx_\t\n") + ["\xa0", "\u2003", "\u0663", "\u00e9", "\u00bd"]
+
+def mutate(text, rng, edits):
+    chars = list(text)
+    for _ in range(edits):
+        k = rng.randrange(len(chars) + 1)
+        op = rng.random()
+        if op < 0.4 or not chars:
+            chars.insert(k, rng.choice(fuzz_alphabet))
+        elif op < 0.8:
+            chars[min(k, len(chars) - 1)] = rng.choice(fuzz_alphabet)
+        else:
+            del chars[min(k, len(chars) - 1)]
+    return "".join(chars)
+
+tokenizer_samples = [
+    "1 Shen, Adam 12 29.87", "  12 O'Brien-Li, Mary Jane 10 1:02.34", "3 Doe,  John  1229.87 extra",
+    "1   , x 12 29.87", "1 A, 12 29.87", "1 A, \t5 10.00", "1 A, B\t5 10.00\n", "1 A, B 5 10.00\nx",
+    "1 A, B c5 102.34 ", "4 Li (Amy), Jo 9 12:01.10", "Male 50 Free Times",
+]
+tokenizer_headers = ["Male 50 Free Times", "Female 100 IM Times", "Female 200 Breast Times", "Male 50Fly Times",
+                     "Male Back Times", "Team Results", "Female 100 Freestyle Times"]
+
+def pathological_lines(n):
+    """Lines of about n characters that push a backtracking matcher, keyed by what they stress."""
+    return {
+        "spaces after comma": "1 A," + " " * n + "x",
+        "spaces after place": "1" + " " * n + "x",
+        "long age": "1 A, B 1" + "1" * n + ".",
+        "mixed spacing": "1 A, B 1" + " \t" * (n // 2) + "1.",
+        "long first name": "1 A, " + "B" * n + " 12",
+        "many name words": "1 A, " + "B " * (n // 2) + "x",
+        "no comma": "1 " + "A " * (n // 2) + "12 29.87",
+    }
+
+def bench_tokenizer(fuzz=200_000, lengths=(1_000, 2_000, 4_000), seed=1):
+    """Checks tokenizeResultLine and parseEventHeader against the old regex and header walk, then times both.
+
+    Parity covers synthetic result pages, fixed edge cases and randomly mutated or random
+    lines; any difference raises. The pathological lines show how each scales with length.
+    """
+    rng = random.Random(seed)
+    roster = synthetic_data.make_roster(500, seed)
+    lines = [line for event in synthetic_data.events for gender in ["Male", "Female"]
+             for line in synthetic_data.make_result_lines(event, gender, roster, seed)]
+    lines += tokenizer_samples
+    lines += [mutate(rng.choice(lines[:200] + tokenizer_samples), rng, rng.randint(1, 4)) for _ in range(fuzz // 2)]
+    lines += ["".join(rng.choice(fuzz_alphabet) for _ in range(rng.randint(0, 30))) for _ in range(fuzz // 2)]
+    for line in lines:
+        if main.tokenizeResultLine(line) != reference_tokens(line):
+            raise Exception(f"Tokenizer differs from the regex on {line!r}: {main.tokenizeResultLine(line)} != {reference_tokens(line)}")
+    headers = tokenizer_headers + [mutate(rng.choice(tokenizer_headers), rng, rng.randint(1, 3)) for _ in range(fuzz // 10)]
+    for header in headers:
+        if parsed_event(header) != reference_event(header):
+            raise Exception(f"Header parsing differs on {header!r}: {parsed_event(header)} != {reference_event(header)}")
+    print(f"Parity: {len(lines)} lines and {len(headers)} headers match the old parser")
+    
+    real = lines[:len(lines) - fuzz]
+    for label, run in [("regex", reference_tokens), ("tokenizer", main.tokenizeResultLine)]:
+        st = time()
+        for line in real:
+            run(line)
+        print(f"{label}: {(time() - st) / len(real) / 1000:.2f} us per result line")
+    
+    for length in lengths:
+        row = []
+        for label, line in pathological_lines(length).items():
+            st = time()
+            reference_tokens(line)
+            mid = time()
+            main.tokenizeResultLine(line)
+            row.append(f"{label} {(mid - st) / 1_000_000:.1f}/{(time() - mid) / 1_000_000:.2f}")
+        print(f"{length} chars, regex/tokenizer ms: " + ", ".join(row))
+
+startup_modes = {  # mode: (code, whether it must start within the budget)
+    "menu": ("import main", True),
+    "manual entry (4)": ("import main; main.ManualEntrySession", True),
+    "relay tool (5)": ("import main; main.medley_main", True),
+    "download (1/2)": ("import main, requests", False),
+    "decode PDFs (3)": ("import main, requests, pypdf, weasyprint", False),
+}
+
+def bench_startup(repeats=5, budget_ms=300):
+    """Times a fresh interpreter reaching each mode, and lists the slowest imports from -X importtime."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    for mode, (code, instant) in startup_modes.items():
+        best = None
+        for _ in range(repeats):
+            st = time()
+            result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                                    cwd=here, capture_output=True, text=True)
+            elapsed = (time() - st) / 1_000_000
+            best = elapsed if best is None else min(best, elapsed)
+        if result.returncode != 0:
+            print(f"{mode}: failed ({result.stderr.strip().splitlines()[-1]})")
+            continue
+
+        imports = []
+        for line in result.stderr.splitlines():
+            parts = line.split("|")
+            if line.startswith("import time:") and len(parts) == 3 and parts[1].strip().isdigit():
+                imports.append((int(parts[1]), parts[2].strip()))
+        slowest = ", ".join(f"{name} {us / 1000:.0f} ms" for us, name in sorted(imports, reverse=True)[:3])
+        verdict = "no budget" if not instant else "ok" if best <= budget_ms else "OVER BUDGET"
+        print(f"{mode}: {best:.0f} ms ({verdict}; slowest imports: {slowest})")
+
+pipeline_sizes = (50, 500, 5_000, 50_000)
+pdf_stage_limit = 500  # Rendering result pages to PDF is slow; only small sizes time readPDFFile
+
+def measure(setup, run, repeats):
+    """Best time of `repeats` runs in ms. setup() builds fresh input, so mutating stages can repeat."""
+    best = None
+    for _ in range(repeats):
+        data = setup()
+        st = time()
+        run(data)
+        elapsed = time() - st
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best / 1_000_000, 3)
+
+def pdf_support():
+    try:
+        import pypdf, weasyprint
+        return None
+    except ImportError as e:
+        return f"skipped: {e.name} is not installed"
+
+def pipeline_stages(swimmers, seed=1, repeats=3, queries=200):
+    """Times each pipeline stage on one synthetic data set. Returns {stage: {"ms": ..., ...}}."""
+    roster = synthetic_data.make_roster(swimmers, seed)
+    sheet = synthetic_data.make_time_sheet(roster, seed)
+    pages = {}
+    for gender in ["Male", "Female"]:
+        for event in synthetic_data.events:
+            lines = synthetic_data.make_result_lines(event, gender, roster, seed)
+            pages[synthetic_data.result_file_name(event, gender)] = (lines, synthetic_data.make_result_page(lines))
+    result_lines = sum(len(lines) - 1 for lines, _ in pages.values())
+    stages = {}
+    
+    skip = pdf_support()
+    if skip is None and swimmers > pdf_stage_limit:
+        skip = f"skipped: over {pdf_stage_limit} swimmers"
+    if skip is None:
+        pdfs = [main.renderPdf(page) for _, page in pages.values()]
+        stages["readPDFFile"] = {"ms": measure(lambda: pdfs, lambda d: [main.readPDFFile(BytesIO(pdf)) for pdf in d], repeats),
+                                 "pages": len(pdfs)}
+    else:
+        stages["readPDFFile"] = {"ms": None, "note": skip}
+    
+    stages["readHTMLResults"] = {
+        "ms": measure(lambda: pages, lambda d: [main.readHTMLResults(page) for _, page in d.values()], repeats),
+        "pages": len(pages),
+    }
+    
+    decoded = [main.extractTimes(lines[0], lines[1:]) for lines, _ in pages.values()]
+    stages["extractTimes"] = {
+        "ms": measure(lambda: pages, lambda d: [main.extractTimes(lines[0], lines[1:]) for lines, _ in d.values()], repeats),
+        "lines": result_lines,
+    }
+    
+    sanitized = [(event, main.sanitize_entries(times, roster)) for event, times in decoded]
+    stages["sanitize_entries"] = {
+        "ms": measure(lambda: decoded, lambda d: [main.sanitize_entries(times, roster) for _, times in d], repeats),
+        "rows": result_lines,
+        "rejected": result_lines - sum(len(times) for _, times in sanitized),
+    }
+    
+    stages["cleanUpCSV"] = {
+        "ms": measure(lambda: [row[:] for row in sheet], lambda d: main.cleanUpCSV(roster, d), repeats),
+        "rows": len(sheet) - 1,
+    }
+    
+    def merge(data):
+        table = main.BestTimeTable(data)
+        for event, times in sanitized:
+            main.writeEventToCSV(event, data, times, table=table)
+    stages["writeEventToCSV"] = {
+        "ms": measure(lambda: [row[:] for row in sheet], merge, repeats),
+        "times": sum(len(times) for _, times in sanitized),
+    }
+    
+    relay_divisions = ["3B", "4B"]
+    relay_times = relay_tools.get_swimtimes_bydiv(relay_divisions, sheet)
+    stages["SplitTable"] = {"ms": measure(lambda: sheet, relay_tools.SplitTable, repeats), "rows": len(sheet) - 1}
+    splits = relay_tools.SplitTable(sheet)
+    stages["split_model.fit"] = {
+        "ms": measure(lambda: sheet, lambda d: split_model.fit(d, per_division=True), repeats),
+        "rows": len(sheet) - 1,
+    }
+    stages["get_swimtimes_bydiv"] = {
+        "ms": measure(lambda: splits, lambda d: relay_tools.get_swimtimes_bydiv(relay_divisions, d), repeats),
+        "swimmers": len(relay_times),
+    }
+    
+    columns = [relay_tools.parse_column(entry[1][leg] or "" for entry in relay_times) for leg in range(4)]
+    relay_cs = [(entry[0], [int(col[i]) if col[i] != relay_tools.MISSING else None for col in columns])
+                for i, entry in enumerate(relay_times)]
+    stages["find_minimum_sum_combination"] = {
+        "ms": measure(lambda: relay_cs, relay_tools.find_minimum_sum_combination, repeats),
+        "swimmers": len(relay_cs),
+    }
+    
+    rng = random.Random(seed)
+    lookups = []
+    for _ in range(queries):
+        name = list(rng.choice(roster)[0].lower())
+        name[rng.randrange(len(name))] = rng.choice("xyzq")
+        lookups.append("".join(name))
+    stages["NameIndex"] = {"ms": measure(lambda: roster, relay_tools.NameIndex, repeats), "names": len(roster)}
+    index = relay_tools.NameIndex(roster)
+    search_ms = measure(lambda: lookups, lambda d: [relay_tools.name_fuzzy_search(name, index) for name in d], 1)
+    stages["name_fuzzy_search"] = {"ms": search_ms, "queries": queries, "ms_per_query": round(search_ms / queries, 3)}
+    
+    def registry(rows):
+        reg = swimmer_registry.SwimmerRegistry()
+        reg.sync(rows)
+        return reg
+    stages["SwimmerRegistry"] = {"ms": measure(lambda: roster, registry, repeats), "names": len(roster)}
+    reg = registry(roster)
+    variants = [f" {name.upper()} " for name, _ in roster[:queries]] + lookups  # Respellings, then unknown names
+    resolve_ms = measure(lambda: variants, lambda d: [reg.resolve(name) for name in d], 1)
+    stages["SwimmerRegistry.resolve"] = {"ms": resolve_ms, "queries": len(variants), "ms_per_query": round(resolve_ms / len(variants), 4)}
+    return stages
+
+def bench_pipeline(sizes=pipeline_sizes, seed=1, repeats=3, output=None):
+    """Times every pipeline stage at each roster size and reports the results as JSON.
+
+    The JSON goes to `output` (a path) or stdout. Stage output printed by the pipeline
+    itself is discarded so it does not skew the timings or mix into the report.
+    """
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        synthetic_data.check_round_trip(synthetic_data.make_roster(50, seed), seed)
+    policies = main.missingSwimmerPolicy, main.missingNamePolicy
+    main.missingSwimmerPolicy, main.missingNamePolicy = "keep", "ignore"
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "repeats": repeats,
+        "sizes": [],
+    }
+    try:
+        for swimmers in sizes:
+            st = time()
+            with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                stages = pipeline_stages(swimmers, seed, repeats)
+            report["sizes"].append({"swimmers": swimmers, "stages": stages})
+            print(f"{swimmers} swimmers done in {(time() - st) / 1_000_000_000:.1f} s", file=sys.stderr)
+    finally:
+        main.missingSwimmerPolicy, main.missingNamePolicy = policies
+    
+    text = json.dumps(report, indent=1)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+        print(f"Wrote pipeline benchmark to {output}")
+    else:
+        print(text)
+    return report
+
+benchmarks = {
+    "html_vs_pdf": bench_html_vs_pdf,
+    "merge": bench_merge,
+    "medley": bench_medley,
+    "meet": bench_meet,
+    "fuzzy": bench_fuzzy,
+    "startup": bench_startup,
+    "pipeline": bench_pipeline,
+    "pdf_text": bench_pdf_text,
+    "tokenizer": bench_tokenizer,
+}
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    output = None
+    if "--output" in args:  # Where bench_pipeline writes its JSON report
+        i = args.index("--output")
+        output = args[i + 1]
+        del args[i:i + 2]
+    
+    chosen = args or list(benchmarks)
+    for name in chosen:
+        print(f"\n== {name} ==")
+        if name == "pipeline":
+            bench_pipeline(output=output)
+        else:
+            benchmarks[name]()
@@ -1,18 +1,30 @@
-print("Importing libraries...")
-
 import csv
-from pypdf import PdfReader
+import hashlib
+import json
+import logging
 import re
 import os
-import requests
-from weasyprint import HTML, CSS
+import queue
+import sys
+import threading
+from collections import deque
+from time import monotonic, sleep
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing, contextmanager, nullcontext, redirect_stdout
+from html.parser import HTMLParser
+from io import BytesIO
+from urllib.parse import quote, urlsplit
 from typing import Any
 
 from relay_tools import *
+from run_metrics import RunMetrics
+from swimmer_registry import IGNORED, SwimmerRegistry
+from time_codec import ZERO_DURATION, format_duration, is_canonical, normalize_duration, parse_duration
 
-print("Libraries imported successfully.")
+# requests, pypdf and weasyprint are imported where they are used, so the menu, manual
+# entry and the relay tool start without paying for them. WeasyPrint alone takes seconds.
 
-css = CSS(string="""
+printCssText = """
 @page {
     size: 8.5in 1000in;
     margin: 0.01in;
@@ -29,12 +41,217 @@ css = CSS(string="""
         display: none;
     }
 }
-""")
+"""
+printCss = None
+
+log = logging.getLogger("best_time_tracker")
+
+def renderPdf(html: str, output_path=None, base_url=None):
+    """Renders a results page to PDF with WeasyPrint. Returns the bytes when no path is given."""
+    global printCss
+    from weasyprint import HTML, CSS
+    
+    if printCss is None:
+        printCss = CSS(string=printCssText)
+    return HTML(string=html, base_url=base_url).write_pdf(output_path, stylesheets=[printCss])
+
+class HostRateLimiter:
+    """Spaces out requests so each host sees at most `per_second` requests per second,
+    and at most `max_concurrent` of them in flight at once (0 for no cap)."""
+    
+    def __init__(self, per_second: float, max_concurrent: int = 0):
+        self.interval = 1 / per_second if per_second > 0 else 0
+        self.max_concurrent = max_concurrent
+        self.lock = threading.Lock()
+        self.next_slot = {}
+        self.host_slots = {}
+    
+    @contextmanager
+    def slot(self, url: str):
+        """Holds one of the host's concurrent request slots for the duration of a request."""
+        semaphore = None
+        if self.max_concurrent > 0:
+            host = urlsplit(url).netloc
+            with self.lock:
+                semaphore = self.host_slots.setdefault(host, threading.BoundedSemaphore(self.max_concurrent))
+            semaphore.acquire()
+        try:
+            self.wait(url)
+            yield
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+    
+    def wait(self, url: str):
+        if self.interval == 0:
+            return
+        host = urlsplit(url).netloc
+        with self.lock:
+            now = monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        if slot > now:
+            sleep(slot - now)
 
-def downloadSwimResultsPdf(url, output_path):
-    resp = requests.get(url)
+def createSession(pool_size: int):
+    """Creates a keep-alive session whose connection pool fits `pool_size` workers."""
+    import requests
+    
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def fetchResultsPage(url, session=None, limiter=None, headers=None):
+    if session is None:
+        import requests as session
+    if limiter is None:
+        resp = session.get(url, headers=headers)
+    else:
+        with limiter.slot(url):
+            resp = session.get(url, headers=headers)
     resp.raise_for_status()
-    HTML(string=resp.text, base_url=url).write_pdf(output_path, stylesheets=[css])
+    return resp
+
+def fetchChangedPage(url, eventName, cached, have_copy, session=None, limiter=None):
+    """Fetches an event page unless the copy described by `cached` is still current.
+
+    Returns:
+        tuple | None: (response, fresh manifest fields), or None when the content has not changed.
+    """
+    headers = {}
+    if have_copy and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if have_copy and cached.get("last_modified"):
+        headers["If-Modified-Since"] = cached["last_modified"]
+    
+    # Only the request itself is timed, not the wait for a rate-limit slot.
+    with limiter.slot(url) if limiter is not None else nullcontext():
+        with metrics.timer(eventName, "download_ms"):
+            resp = fetchResultsPage(url, session, headers=headers)
+    metrics.count(eventName, "bytes_downloaded", len(resp.content))
+    if resp.status_code == 304:
+        return None
+    
+    digest = hashlib.sha256(resp.content).hexdigest()
+    if have_copy and cached.get("sha256") == digest:
+        return None
+    
+    return resp, {
+        "url": url,
+        "sha256": digest,
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+    }
+
+def downloadEvent(url, output_path, cached=None, session=None, limiter=None):
+    """Downloads one event unless the cached copy is still current.
+
+    Args:
+        url (str): The event results page.
+        output_path (str): Where the page (.html) or rendered PDF (.pdf) is written.
+        cached (dict | None): The event's previous cache manifest entry, if any.
+
+    Returns:
+        dict | None: A fresh manifest entry, or None when the content has not changed.
+    """
+    have_file = cached is not None and cached.get("file") == os.path.basename(output_path) and os.path.exists(output_path)
+    # Entries from renderEventInMemory without an archived PDF have no file, but their times
+    # are already parsed, so an unchanged page is not fetched and rendered again for them.
+    have_times = cached is not None and "file" not in cached and "times" in cached and cached.get("sha256") is not None
+    eventName = os.path.splitext(manifestKey(output_path))[0]
+    fetched = fetchChangedPage(url, eventName, cached, have_file or have_times, session, limiter)
+    if fetched is None:
+        return None
+    resp, entry = fetched
+    
+    if output_path.endswith(".pdf"):
+        with metrics.timer(eventName, "render_ms"):
+            renderPdf(resp.text, output_path, base_url=url)
+    else:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(resp.text)
+    
+    entry["file"] = os.path.basename(output_path)
+    return entry
+
+def renderEventInMemory(url, output_path, cached=None, session=None, limiter=None, archiver=None):
+    """PDF mode without the disk round trip: renders into a buffer and parses the buffer directly.
+
+    The PDF only reaches `output_path` when an archiver is given, and then in the background.
+
+    Returns:
+        dict | None: A fresh manifest entry holding the parsed event and times, or None
+        when the content has not changed since the times in `cached` were parsed.
+    """
+    have_times = cached is not None and "times" in cached and cached.get("sha256") is not None
+    eventName = os.path.splitext(manifestKey(output_path))[0]
+    fetched = fetchChangedPage(url, eventName, cached, have_times, session, limiter)
+    if fetched is None:
+        return None
+    resp, entry = fetched
+    
+    with metrics.timer(eventName, "render_ms"):
+        pdf = renderPdf(resp.text, base_url=url)
+    with metrics.timer(eventName, "parse_ms"):
+        event, times = extractTimes(*readPDFFile(BytesIO(pdf)))
+    metrics.count(eventName, "rows_parsed", len(times))
+    
+    if archiver is not None:
+        archiver.write(output_path, pdf)
+        entry.update(file=os.path.basename(output_path), file_sha256=hashlib.sha256(pdf).hexdigest())
+    entry.update(event=event, times=times)
+    return entry
+
+class AsyncArchiver:
+    """Writes files on a background thread so archiving never holds up parsing."""
+    
+    def __init__(self):
+        self.pool = ThreadPoolExecutor(max_workers=1)
+        self.pending = []
+    
+    def save(self, path, data):
+        temp_name = path + ".tmp"
+        with open(temp_name, 'wb') as f:
+            f.write(data)
+        os.replace(temp_name, path)
+    
+    def write(self, path, data):
+        self.pending.append((path, self.pool.submit(self.save, path, data)))
+    
+    def close(self):
+        """Waits for every write and logs the ones that failed."""
+        self.pool.shutdown(wait=True)
+        for path, future in self.pending:
+            if future.exception() is not None:
+                log.warning(f"Could not archive {path}: {future.exception()}")
+        if self.pending:
+            log.info(f"Archived {sum(future.exception() is None for _, future in self.pending)} PDF(s) in the background.")
+
+def loadCacheManifest():
+    if not os.path.exists(cache_manifest_file_name):
+        return {}
+    try:
+        with open(cache_manifest_file_name, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        log.warning(f"Ignoring unreadable cache manifest {cache_manifest_file_name}: {e}")
+        return {}
+
+def saveCacheManifest(manifest):
+    temp_name = cache_manifest_file_name + ".tmp"
+    with open(temp_name, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(temp_name, cache_manifest_file_name)
+
+def manifestKey(path):
+    # Home team files keep their bare names; other teams' files are prefixed with their folder.
+    return os.path.relpath(path, pdf_folder_name).replace(os.sep, "/")
+
+def fileDigest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
 
 def createEventParameters():
     sexes = ["M", "F"]
@@ -52,62 +269,227 @@ def createEventParameters():
     
     return combos
 
-def getAllEvents(combos):
+def readTeams():
+    """The home team followed by the teams listed in teams_file_name, as (team id, team code) pairs."""
+    teams = [home_team]
+    if os.path.exists(teams_file_name):
+        for row in readCSV(teams_file_name)[1:]:
+            if len(row) >= 2 and row[0].strip() and (row[0].strip(), row[1].strip()) not in teams:
+                teams.append((row[0].strip(), row[1].strip()))
+    return teams
+
+def teamSlug(team):
+    code = re.sub(r"\W+", "_", team[1]).strip("_")
+    return f"{team[0]}_{code}"
+
+def teamFolder(team):
+    """Where a team's result files go. The home team uses pdf_folder_name itself."""
+    return pdf_folder_name if team == home_team else f"{pdf_folder_name}/{teamSlug(team)}"
+
+def eventUrl(team, combo):
+    return (fr"https://sports-tek.active.com/tmonline/aTeamResults.asp?Sex={combo[0]}&Stroke={combo[1]}&Distance={combo[2]}"
+            fr"&Course=S&Fastest=1&TEAM={team[0]}&CODE={quote(team[1])}&Low=&High=&thePage=1&PageSize=999&STD=false"
+            fr"&DB=upload\BCSSAProvincialOffice.mdb&Division=&Region=")
+
+def eventJobs(combos, teams):
+    """Lists (team, url, output path) for every team and event, creating the team folders."""
     strokeToShorthand = {"1": "FR", "2": "BK", "3": "BR", "4": "FL", "5": "IM"}
-    urls = []
-    for c in combos:
-        urls.append((fr"https://sports-tek.active.com/tmonline/aTeamResults.asp?Sex={c[0]}&Stroke={c[1]}&Distance={c[2]}&Course=S&Fastest=1&TEAM=35&CODE=Burnaby%20Mountain%20Mantas&Low=&High=&thePage=1&PageSize=999&STD=false&DB=upload\BCSSAProvincialOffice.mdb&Division=&Region=", c))
-    
-    for link, event in urls:
-        downloadSwimResultsPdf(
-            link,
-            f"grabbed_pdfs/{event[0]}{event[2]}{strokeToShorthand[event[1]]}.pdf"
-        )
-        print(f"Finished {event[0]}{event[2]}{strokeToShorthand[event[1]]}")
-    return
+    jobs = []
+    for team in teams:
+        folder = teamFolder(team)
+        os.makedirs(folder, exist_ok=True)
+        for c in combos:
+            eventName = f"{c[0]}{c[2]}{strokeToShorthand[c[1]]}"
+            fileName = f"{eventName}.html" if use_html_parser else f"{eventName}.pdf"
+            jobs.append((team, eventUrl(team, c), f"{folder}/{fileName}"))
+    return jobs
+
+def getAllEvents(combos, teams=None):
+    """Downloads every event for every team through one pool of workers.
+
+    max_concurrent_downloads caps the requests in flight overall; max_downloads_per_host and
+    requests_per_host_per_second cap what any one host sees. Returns the failed downloads.
+    """
+    urls = [(url, path) for _, url, path in eventJobs(combos, teams or [home_team])]
+    
+    workers = max(1, max_concurrent_downloads)
+    limiter = HostRateLimiter(requests_per_host_per_second, max_downloads_per_host)
+    manifest = loadCacheManifest()
+    failed = []
+    unchanged = 0
+    
+    with createSession(workers) as session, ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for link, path in urls:
+            key = manifestKey(path)
+            future = pool.submit(downloadEvent, link, path, manifest.get(key), session, limiter)
+            futures[future] = key
+        
+        for done, future in enumerate(as_completed(futures), 1):
+            key = futures[future]
+            eventName = os.path.splitext(key)[0]
+            try:
+                entry = future.result()
+            except Exception as e:
+                failed.append(eventName)
+                log.warning(f"Failed {eventName} ({done}/{len(futures)}): {e}")
+                continue
+            
+            if entry is None:
+                unchanged += 1
+                metrics.count(eventName, "unchanged")
+                log.debug(f"Unchanged {eventName} ({done}/{len(futures)})")
+            else:
+                manifest[key] = entry
+                log.debug(f"Finished {eventName} ({done}/{len(futures)})")
+    
+    saveCacheManifest(manifest)
+    log.info(f"{unchanged} of {len(urls)} event(s) unchanged since the last download.")
+    for eventName in failed:
+        metrics.count(eventName, "download_failed")
+    if failed:
+        log.warning(f"{len(failed)} event(s) failed to download: {', '.join(sorted(failed))}")
+    return failed
 
 def ensureNeededFiles():
     """Ensures that the needed files for operations exist."""
     if not os.path.exists(pdf_folder_name):
         os.makedirs(pdf_folder_name)
-        print(f"Created folder: {pdf_folder_name}")
+        log.info(f"Created folder: {pdf_folder_name}")
     else:
-        print(f"Folder already exists: {pdf_folder_name}")
+        log.debug(f"Folder already exists: {pdf_folder_name}")
     
     if not os.path.exists(csv_output_file_name):
         with open(csv_output_file_name, 'w', newline='') as f:
             pass
-        print(f"Created file: {csv_output_file_name}")
+        log.info(f"Created file: {csv_output_file_name}")
     
     if not os.path.exists(swimmer_info_file_name):
         with open(swimmer_info_file_name, 'w', newline='') as f:
             pass
-        print(f"Created file: {swimmer_info_file_name}")
+        log.info(f"Created file: {swimmer_info_file_name}")
+
+def textLines(chunks):
+    """Yields the lines of text that arrives in chunks, such as one PDF page at a time.
+
+    Chunks are joined without a separator, so a line running over a page break comes out whole.
+    """
+    carry = ""
+    for chunk in chunks:
+        lines = (carry + chunk).split("\n")
+        carry = lines.pop()
+        yield from lines
+    yield carry
+
+def filterResultLines(text_body):
+    """Picks the event header and every line starting with a placing out of the text, in one pass.
+
+    Returns:
+        tuple: (header line or None, list of result lines). The last header line wins.
+    """
+    header = None
+    output = []
+    for line in text_body:
+        if len(line) > 0 and line[0].isnumeric():
+            output.append(line.strip())
+        elif line[:4] == "Fema" or line[:4] == "Male":
+            header = line.strip()
+    
+    return header, output
 
 def readPDFFile(filename: str):
-    """Parses a PDF file with best times and returns list of lines with best times.
+    """Parses a PDF file with best times, extracting the text one page at a time.
 
     Args:
-        filename (str): The PDF to parse.
+        filename (str): The PDF to parse, or a binary stream holding one.
 
     Returns:
-        list: A list of strings each containing each line of the times extracted.
+        tuple: The event header line, and a list of the lines with times.
     """
+    from pypdf import PdfReader
+    
     reader = PdfReader(filename)
+    return filterResultLines(textLines(page.extract_text() for page in reader.pages))
 
-    parts = ""
-    for page in reader.pages:
-        parts += page.extract_text()
+class ResultsPageParser(HTMLParser):
+    """Flattens an aTeamResults.asp page into text lines, one per table row or block element.
     
-    text_body = "".join(parts).split("\n")
-    output = []
-    for line in text_body:
-        if len(line) > 0 and line[0].isnumeric():
-            output.append(line)
-        if line[:4] == "Fema" or line[:4] == "Male":
-            output.insert(0, line)
+    Cells of a row are joined with single spaces, which is the same shape the PDF text
+    extraction produces, so the lines can go through extractTimes unchanged.
+    """
+    
+    blockTags = {"tr", "p", "div", "br", "table", "li", "h1", "h2", "h3", "h4", "h5", "h6"}
+    skippedTags = {"script", "style", "head", "title"}
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.lines = []
+        self.current = []
+        self.skipDepth = 0
+    
+    def endLine(self):
+        line = " ".join(" ".join(self.current).split())
+        if line:
+            self.lines.append(line)
+        self.current = []
     
-    return [i.strip() for i in output]
+    def handle_starttag(self, tag, attrs):
+        if tag in self.skippedTags:
+            self.skipDepth += 1
+        elif tag in self.blockTags:
+            self.endLine()
+    
+    def handle_endtag(self, tag):
+        if tag in self.skippedTags:
+            self.skipDepth = max(0, self.skipDepth - 1)
+        elif tag in self.blockTags:
+            self.endLine()
+        elif tag in {"td", "th"}:
+            self.current.append(" ")
+    
+    def handle_data(self, data):
+        if self.skipDepth == 0:
+            self.current.append(data)
+    
+    def close(self):
+        super().close()
+        self.endLine()
+
+def readHTMLResults(html: str):
+    """Parses an event results page directly and returns the same lines readPDFFile would.
+
+    Args:
+        html (str): The page source returned by aTeamResults.asp.
+
+    Returns:
+        tuple: The event header line, and a list of the lines with times.
+    """
+    parser = ResultsPageParser()
+    parser.feed(html)
+    parser.close()
+    return filterResultLines(parser.lines)
+
+def readHTMLFile(filename: str):
+    """Decodes a saved results page, rendering it through the PDF path if the direct parse fails.
+
+    A page whose result lines parse to no times at all counts as a failed parse too.
+    """
+    with open(filename, 'r', encoding='utf-8') as f:
+        html = f.read()
+    
+    try:
+        header, lines = readHTMLResults(html)
+        event, times = extractTimes(header, lines)
+        if lines and not times:
+            raise Exception(f"none of its {len(lines)} result line(s) matched")
+    except Exception as e:
+        log.warning(f"Direct HTML parse failed for {filename} ({e}), falling back to PDF rendering.")
+        pdf = renderPdf(html)
+        return extractTimes(*readPDFFile(BytesIO(pdf)))
+    
+    if not times:
+        log.warning(f"No times found in {filename} ({event}).")
+    return event, times
 
 def readCSV(csvName: str):
     rows = []
@@ -122,19 +504,90 @@ def writeCSV(csvName: str, rows: list[Any]):
     with open(csvName, 'w', newline='') as csvfile:
         csv.writer(csvfile).writerows(rows)
 
-def extractTimes(lines: list[str]) -> tuple[str, list[list[str]]]:
-    output = []
-    nameTimePattern = re.compile(
-        r"^\s*\d+\s*([a-zA-Z\-' ()]+?),\s*([a-zA-Z\-' ()]+?)(?=\s?\d+)\s*\w+\s*(\d{0,2}:?\d{2}\.\d{2}).*$"
-    )
-    for line in lines[1:]:
-        result = nameTimePattern.search(line)
-        if result:
-            output.append(list(result.groups()))
+# Scanners for the runs a result line is made of. Each only takes greedy runs and has
+# nothing after them that can fail, so matching never backtracks.
+placeRun = re.compile(r"\s*(\d*)\s*")
+firstNameRun = re.compile(r"\s*([a-zA-Z\-' ()]*)")
+ageRun = re.compile(r"\s*(\w*)\s*")
+timePattern = re.compile(r"\d{0,2}:?\d{2}\.\d{2}")  # At most 8 characters, so trying it is constant time
+nameChars = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ-' ()"
+
+# Fast path for well-formed lines, with single spaces between the parts and between name
+# words. Spaces are the only separators and never part of a word, so there is one way to
+# split a line and a failed match gives up without backtracking.
+plainResultLine = re.compile(
+    r"\s*\d+ ([a-zA-Z\-'()]+(?: [a-zA-Z\-'()]+)*), ([a-zA-Z\-'()]+(?: [a-zA-Z\-'()]+)*) \d+ (\d{0,2}:?\d{2}\.\d{2})"
+)
+
+def tokenizeResultLine(line: str):
+    """Splits a result line like '1 Shen, Adam 12 29.87' into ('Shen', 'Adam', '29.87').
+
+    Reads the line once: place, last name up to the first comma, first name up to the
+    age, then the time after the age. Returns None for lines that are not results.
+    """
+    plain = plainResultLine.match(line)
+    if plain and "\n" not in line:
+        return plain.groups()
     
-    output = [[res[1] + " " + res[0], res[2]] for res in output]
+    n = len(line)
+    place = placeRun.match(line)
+    i = place.end(1)
+    if i == place.start(1):
+        return None
     
-    firstline = lines[0].strip()
+    # Last name: everything up to the first comma, in name characters only
+    start = place.end()
+    comma = line.find(",", start)
+    if comma < 0 or line[start:comma].strip(nameChars):
+        return None
+    if comma == start:
+        if start == i or line[start - 1] != " ":
+            return None
+        start -= 1  # Only a space before the comma; it becomes the name
+    last = line[start:comma]
+    
+    # First name: the run of name characters that ends just before the age
+    firstName = firstNameRun.match(line, comma + 1)
+    m, end = firstName.span(1)
+    nextIsDigit = end < n and line[end].isdecimal()
+    if end > m:
+        if nextIsDigit and end - 1 > m and line[end - 1] == " ":
+            first = line[m:end - 1]
+        elif nextIsDigit or (end + 1 < n and line[end].isspace() and line[end + 1].isdecimal()):
+            first = line[m:end]
+        else:
+            return None
+    elif nextIsDigit and (m - 1 > comma and line[m - 1] == " " or m - 2 > comma and line[m - 2] == " "):
+        first = " "  # Only spacing between the comma and the age; a space becomes the name
+    else:
+        return None
+    
+    # Age (any word), then the time. In a run like '1229.87' the time ends the word, and
+    # as ':' and '.' end a word, it can only start in the last four characters.
+    age = ageRun.match(line, end)
+    q, w = age.span(1)
+    t = age.end()
+    for wordEnd in range(w, max(q, w - 5), -1):
+        if wordEnd < w:
+            t = wordEnd
+        time = timePattern.match(line, t)
+        if time and line.find("\n", time.end(), n - 1) < 0:
+            return last, first, time.group()
+    return None
+
+eventToShorthand = {
+    "Free": "FR",
+    "Back": "BK",
+    "Fly": "FL",
+    "Breast": "BR",
+    "IM": "IM"
+}
+
+def parseEventHeader(header: str | None) -> str:
+    """Turns a header like 'Male 50 Free Times' into the event shorthand, '50FR'."""
+    if header is None:
+        raise Exception("No event header line found in results")
+    firstline = header.strip()
     
     if "Female" in firstline:
         firstline = firstline[7:-6]
@@ -143,31 +596,49 @@ def extractTimes(lines: list[str]) -> tuple[str, list[list[str]]]:
     else:
         raise Exception(f"Can't determine gender classification from first line '{firstline}'")
     
-    event = ""
-    i = len(firstline)-1
-    while i >= 0:
-        if firstline[i].isnumeric() or firstline[i] == " ":
-            break
-        event = firstline[i] + event
+    # The stroke is the trailing run of non-digit, non-space characters; the distance is before it
+    i = len(firstline)
+    while i > 0 and not (firstline[i - 1].isnumeric() or firstline[i - 1] == " "):
         i -= 1
-    
-    distance = firstline[0:i].strip()
-    
-    eventToShorthand = {
-        "Free": "FR",
-        "Back": "BK",
-        "Fly": "FL",
-        "Breast": "BR",
-        "IM": "IM"
-    }
+    event = firstline[i:]
+    distance = firstline[0:i - 1].strip()
     
     shorthand = eventToShorthand.get(event)
-    
-    if shorthand:
-        print(f"Successfully deciphered event: {firstline} -> {distance+shorthand}")
-        return distance + shorthand, output
-    else:
+    if not shorthand:
         raise Exception(f"Unable to decipher event: {firstline}")
+    log.debug(f"Successfully deciphered event: {firstline} -> {distance+shorthand}")
+    return distance + shorthand
+
+def extractTimes(header: str | None, lines) -> tuple[str, list[list[str]]]:
+    output = []
+    for line in lines:
+        tokens = tokenizeResultLine(line)
+        if tokens:
+            last, first, time = tokens
+            output.append([first + " " + last, time])
+    
+    event = parseEventHeader(header)
+    return event, output
+
+timeSheetHeader = ['Name','Div.','100IM','200IM','50FL','100FL','50BK','100BK','50BR','100BR','50FR','100FR']
+
+def openTimeStore():
+    """Opens the SQLite time store if it is enabled, seeding it from the CSV on first use."""
+    if not use_sqlite_store:
+        return None
+    from time_store import TimeStore
+    
+    store = TimeStore(sqlite_store_file_name)
+    if store.is_empty() and os.path.exists(csv_output_file_name):
+        store.import_sheet(readCSV(csv_output_file_name), source=csv_output_file_name)
+        log.info(f"Seeded {sqlite_store_file_name} from {csv_output_file_name}.")
+    return store
+
+def readTimeSheet(store=None):
+    """Reads the best-time sheet from the SQLite store when one is open, otherwise from the CSV."""
+    if store is not None:
+        return store.export_rows(timeSheetHeader)
+    return readCSV(csv_output_file_name)
 
 def getSwimmerList(filename, from_timelist=False):
     if from_timelist:
@@ -175,237 +646,814 @@ def getSwimmerList(filename, from_timelist=False):
     
     return readCSV(filename)[1:]
 
-def sanitize_entries(times, swimmerlist):
+def openSwimmerRegistry(swimmerInfo: list[list[str]] | None = None):
+    """Opens the registry, synced to the swimmer list (read from swimmer_info_file_name unless given).
+
+    Always syncing from the swimmer list, never the sheet, keeps swimmers who are only on
+    the sheet from flipping between active and inactive from one mode to the next.
+    """
+    if swimmerInfo is None:
+        swimmerInfo = getSwimmerList(swimmer_info_file_name) if os.path.exists(swimmer_info_file_name) else []
+    registry = SwimmerRegistry(swimmer_registry_file_name)
+    registry.sync([[row[0], row[1]] for row in swimmerInfo if len(row) > 1 and row[0]])
+    return registry
+
+def sanitize_entries(times, swimmerlist, registry: SwimmerRegistry | None = None, unknown: list | None = None):
+    """Keeps the results of swimmers on the list.
+
+    With a registry, results under another spelling of a listed swimmer's name are kept
+    under the listed name, and names the registry has never seen go to `unknown`.
+    """
     out = []
-    onlyNames = [i[0] for i in swimmerlist]
+    onlyNames = {i[0] for i in swimmerlist}
     
     for entry in times:
         if entry[0] in onlyNames:
             out.append(entry)
+        elif registry is not None:
+            sid = registry.resolve(entry[0])
+            if sid is None:
+                if unknown is not None:
+                    unknown.append(entry)
+            elif sid != IGNORED and registry.name_of(sid) in onlyNames:
+                out.append([registry.name_of(sid), entry[1]])
     
     return out
 
-def fixDurationFormatting(time: str):
-    t = list(time)  # Split into characters
-    t = [num for num in t if num.isnumeric()]  # Leave only numbers
+def resolveUnknownNames(unknown: list[list[str]], eventName: str, registry: SwimmerRegistry, nameIndex: NameIndex):
+    """Asks which listed swimmer an unrecognized results name belongs to, if any looks close.
+
+    Answers are saved in the registry, so no name is asked about twice; a skipped name is
+    only asked about again once its closest matches on the list change. Without prompting,
+    or when nothing on the list is close, the results are dropped as before.
+
+    Returns:
+        list: [listed name, time] pairs for the names that were matched.
+    """
+    matched = []
+    for name, time in unknown:
+        sid = registry.resolve(name)  # An earlier answer in this run may cover it
+        if sid is None and missingNamePolicy == "prompt" and name not in skippedNames:
+            sid = promptForAlias(name, eventName, registry, nameIndex)
+        if sid is not None and registry.is_active(sid):
+            matched.append([registry.name_of(sid), time])
+    return matched
+
+def promptForAlias(name: str, eventName: str, registry: SwimmerRegistry, nameIndex: NameIndex):
+    candidates = nameIndex.search(name)[:5]
+    if not candidates or registry.is_dismissed(name, [candidate for candidate, _ in candidates]):
+        skippedNames.add(name)  # Skipped before with the same choices, so not asked again until they change
+        return None
     
-    out = ['', '', '.', '', '', ':', '', '', ':', '', '']  # Duration, starting backwards
+    print(f"'{name}' in {eventName} results is not on the swimmer list. Closest matches:")
+    for i, (candidate, division) in enumerate(candidates, 1):
+        print(f"  {i}. {candidate} ({division})")
+    c = input("Enter a number to record it as that swimmer, 'n' if it is nobody on the list, or nothing to skip for now: ").strip().lower()
     
-    for i in range(len(out)):  # Iterate over digits of output
-        if len(t) == 0:
-            for j in range(i, len(out)):
-                if out[j] == '':
-                    out[j] = '0'
-            break
-        if out[i] == '':
-            out[i] = t.pop()
-        
-    out.reverse()
-    return "".join(out)
+    if c.isdigit() and 1 <= int(c) <= len(candidates):
+        sid = registry.resolve(candidates[int(c) - 1][0])
+        registry.learn(name, sid)
+        return sid
+    if c in {"n", "no"}:
+        registry.ignore(name)
+        return IGNORED
+    registry.dismiss(name, [candidate for candidate, _ in candidates])
+    skippedNames.add(name)
+    return None
 
-def timeToDuration(time: float) -> str:
-    if not isinstance(time, (float, int)):
-        raise TypeError("time must be a float or int")
-    if time < 0:
-        raise Exception(f"Attempted to convert invalid time to duration: {time}")
-    if time == 0:
-        return "00:00:00.00"
+class RosterChanges:
+    """What it takes to bring the sheet in line with the swimmer list, as [name, division] lists."""
     
-    hours = int(time // 3600)
-    time %= 3600
-    minutes = int(time // 60)
-    seconds = int(time % 60)
-    dd = round(round(time - int(time), 2)*100)
+    def __init__(self):
+        self.added = []  # On the swimmer list but not the sheet
+        self.removed = []  # On the sheet but not the swimmer list
+        self.division_changed = []  # [name, sheet division, swimmer list division]
     
-    return f"{hours:02}:{minutes:02}:{seconds:02}.{dd:02}"
+    def __bool__(self):
+        return bool(self.added or self.removed or self.division_changed)
 
-def durationToTime(time: str): 
-    # Assumes that the duration is formatted properly
-    key = [36000, 3600, None, 600, 60, None, 10, 1, None, 0.1, 0.01]  # Value in seconds of each digit of duration
+def diffRoster(swimmerInfo: list[list[str]], csvData: list[list[str]]):
+    """Compares the swimmer list with the sheet rows (header excluded) in one pass over each."""
+    rosterPairs = set()
+    rosterDivision = {}
+    for swimmer in swimmerInfo:
+        rosterPairs.add((swimmer[0], swimmer[1]))
+        rosterDivision.setdefault(swimmer[0], swimmer[1])
     
-    listtime = list(time)
+    sheetPairs = {(row[0], row[1]) for row in csvData}
+    sheetNames = {name for name, _ in sheetPairs}
     
-    if len(listtime) != len(key):
-        raise Exception(f"Attempted to convert duration to time, but failed: '{time}' was not of proper length")
+    changes = RosterChanges()
+    for name, division in sheetPairs:
+        if (name, division) in rosterPairs:
+            continue
+        if name in rosterDivision and (name, rosterDivision[name]) not in sheetPairs:
+            changes.division_changed.append([name, division, rosterDivision[name]])
+        else:
+            changes.removed.append([name, division])
     
-    total = 0.0
-    for i in range(len(key)):
-        if key[i] != None:
-            total += int(listtime[i]) * key[i]
+    for swimmer in swimmerInfo:
+        if swimmer[0] not in sheetNames:
+            sheetNames.add(swimmer[0])
+            changes.added.append([swimmer[0], swimmer[1]])
     
-    return total
+    changes.removed.sort()
+    changes.division_changed.sort()
+    return changes
 
-def cleanUpCSV(swimmerInfo: list[list[str]], csvData : list[list[str]]):
+def applyRosterChanges(changes: RosterChanges, csvData: list[list[str]]):
+    """Applies a change set to the sheet rows (header excluded) in bulk, in place."""
+    dropped = {(name, division) for name, division in changes.removed}
+    moved = {(name, old): new for name, old, new in changes.division_changed}
     
+    csvData[:] = [row for row in csvData if (row[0], row[1]) not in dropped]
+    for row in csvData:
+        new = moved.get((row[0], row[1]))
+        if new is not None:
+            row[1] = new
+    csvData.extend([name, division] + [''] * (len(timeSheetHeader) - 2) for name, division in changes.added)
+
+def confirmRemoval(name: str, division: str):
+    swimmer_string = f"{name} ({division})"
+    if missingSwimmerPolicy == "prompt":
+        choice = input(f"Swimmer {swimmer_string} not found in swimmer list. Remove from CSV? (y/n): ").lower().strip()
+    else:
+        choice = "y" if missingSwimmerPolicy == "remove" else "n"
+    if choice in {"y", "yes"}:
+        return True
+    elif choice in {"n", "no"}:
+        log.info(f"Keeping swimmer {swimmer_string}.")
+    else:
+        log.info(f"Invalid input, keeping swimmer {swimmer_string}.")
+    return False
+
+def reconcileRoster(swimmerInfo: list[list[str]], csvData: list[list[str]]):
+    """Brings the sheet in line with the swimmer list and normalizes its times.
+
+    Returns:
+        tuple: The cleaned sheet, and the RosterChanges that were applied.
+    """
     # Ensure first row actually works
     if len(csvData) != 0:
-        csvData[0] = ['Name','Div.','100IM','200IM','50FL','100FL','50BK','100BK','50BR','100BR','50FR','100FR']
+        csvData[0] = list(timeSheetHeader)
     else:
-        csvData = [['Name','Div.','100IM','200IM','50FL','100FL','50BK','100BK','50BR','100BR','50FR','100FR']]
-    
-    lengthOfRow = len(csvData[0])
-    csvNames = [i[0] for i in csvData[1:]]
-    
-    # Check for updated or deleted swimmers
-    for i in range(len(csvData)-1, 0, -1):  # Start from the end to avoid index issues with popping
-        swimmer_entry = [csvData[i][0], csvData[i][1]]
-        swimmer_string = f"{swimmer_entry[0]} ({swimmer_entry[1]})"
-        if swimmer_entry not in swimmerInfo:
-            choice = input(f"Swimmer {swimmer_string} not found in swimmer list. Remove from CSV? (y/n): ").lower().strip()
-            if choice in {"y", "yes"}:
-                csvData.pop(i)
-                print(f"Swimmer {swimmer_string} removed from CSV.")
-            elif choice in {"n", "no"}:
-                print(f"Keeping swimmer {swimmer_string}.")
-            else:
-                print(f"Invalid input, keeping swimmer {swimmer_string}.")
+        csvData = [list(timeSheetHeader)]
     
-    # Ensure all swimmers are added to CSV
-    for swimmer in swimmerInfo:
-        if swimmer[0] in csvNames:
-            continue
-        
-        else:
-            csvData.append([swimmer[0], swimmer[1]] + [''] * (lengthOfRow-2))
-            print(f"Swimmer {swimmer[0]} ({swimmer[1]}) was not found in sheet, and was added to the CSV.")
+    rows = [row for row in csvData[1:] if row]
+    changes = diffRoster(swimmerInfo, rows)
+    changes.removed = [s for s in changes.removed if confirmRemoval(*s)]
+    applyRosterChanges(changes, rows)
     
-    csvData[1:] = sorted(csvData[1:], key=lambda x: x[0])  # Sort CSV by first name, excluding header row
+    for name, division in changes.removed:
+        removed_swimmers.append([name, division])
+        log.info(f"Swimmer {name} ({division}) removed from CSV.")
+    for name, old, new in changes.division_changed:
+        division_changes.append([name, old, new])
+        log.info(f"Swimmer {name} moved from {old} to {new}.")
+    for name, division in changes.added:
+        log.info(f"Swimmer {name} ({division}) was not found in sheet, and was added to the CSV.")
     
-    for row in csvData:
-        if row[0] == "Name": continue  # Skip header row
+    rows.sort(key=lambda x: x[0])  # Sort CSV by first name, excluding header row
+    csvData[1:] = rows
+    
+    for row in rows:
         for i in range(2, len(row)):  # Starts at 2 because of name and DivG
-            if row[i] == '' or row[i] == '00:00:00.00':  # Don't do anything to empty cells
+            cell = row[i]
+            if cell == '' or cell == ZERO_DURATION:  # Don't do anything to empty cells
                 row[i] = ''  # Remove zero-times
-                continue
-            row[i] = fixDurationFormatting(row[i])  # Ensure duration formatting
+            elif not is_canonical(cell):
+                row[i] = normalize_duration(cell)  # Ensure duration formatting
     
-    return csvData
+    return csvData, changes
+
+def cleanUpCSV(swimmerInfo: list[list[str]], csvData : list[list[str]]):
+    return reconcileRoster(swimmerInfo, csvData)[0]
 
-def writeEventToCSV(eventName : str, csvData : list[list[str]], times : list[list[str]], force_write: bool = False):
-    global ignoreOtherMissingNamesFlag, new_times, updated_times
+class BestTimeTable:
+    """Indexes the best-time sheet by swimmer name and event so whole event batches merge in one pass.
+
+    The table works on the rows of csvData in place, so the list it was built from
+    always reflects the merged times and can be written out directly.
+    """
     
-    # Find event index
-    eventIndex = -1
-    for i in range(len(csvData[0])):
-        if csvData[0][i] == eventName:
-            eventIndex = i
-            break
-    else:
-        raise Exception(f"Unable to find event name '{eventName}' in CSV header.")
+    def __init__(self, csvData: list[list[str]]):
+        self.rows = csvData
+        self.columns = {event: i for i, event in enumerate(csvData[0])} if csvData else {}
+        self.byName = {}
+        for row in csvData[1:]:
+            self.byName.setdefault(row[0], row)  # First row wins, as with the old linear scan
     
-    # Write times to rows
-    for time in times:
-        for row in csvData:
-            if time[0] == row[0]:  # Found right name
-                formattedTime = fixDurationFormatting(time[1])
-                
-                # Check a better time than current or if time is empty
-                if row[eventIndex] == '':
-                    # print(f"Writing {formattedTime} to EMPTY cell of swimmer: {time[0]}, index {eventIndex} ({eventName})")
-                    row[eventIndex] = formattedTime
-                    new_times += 1
-                
-                elif durationToTime(formattedTime) < durationToTime(row[eventIndex]) or (
-                    force_write and durationToTime(formattedTime) >= durationToTime(row[eventIndex])):
-                    # Redundant for casting tomfooleries
-                    
-                    # print(f"Overwriting with {formattedTime} to {row[eventIndex]} swimmer: {time[0]}, index {eventIndex} ({eventName})")
-                    row[eventIndex] = formattedTime
-                    updated_times += 1
-                # else:
-                    # print(f"Equal or better time found: {formattedTime} to {row[eventIndex]} swimmer: {time[0]}, index {eventIndex} ({eventName})")
-                break
+    def column(self, eventName: str):
+        if eventName not in self.columns:
+            raise Exception(f"Unable to find event name '{eventName}' in CSV header.")
+        return self.columns[eventName]
+    
+    def applyEvent(self, eventName: str, times: list[list[str]], force_write: bool = False, applied: list | None = None):
+        """Merges one event's times into the sheet.
+
+        Args:
+            eventName (str): Header of the event column, e.g. '100FR'.
+            times (list): [name, time] pairs.
+            force_write (bool): Overwrite existing times even when they are faster.
+            applied (list): If given, the [name, normalized time] pairs that changed the sheet are appended to it.
+
+        Returns:
+            tuple: (new times, updated times, [name, time] pairs whose name is not in the sheet)
+        """
+        eventIndex = self.column(eventName)
+        new = 0
+        updated = 0
+        missing = []
         
-        else: 
-            if ignoreOtherMissingNamesFlag == False or ignoreOtherMissingNamesFlag is None:
-                print(csvData)
-                c = input(f"Unable to find '{time[0]}' in CSV. Continue with operation? (y/n) ").lower().strip()
-                
-                if c in {"n", "no"}:
-                    raise Exception(f"Execution stopped due to missing name: {time[0]}")
-                
-                elif c in {"y", "yes"} and ignoreOtherMissingNamesFlag is None:
-                    c = input(f"Hide prompt warning for future missing names? (y/n) ").lower().strip()
-                    
-                    if c in {"y", "yes"}:
-                        ignoreOtherMissingNamesFlag = True
-                        print("Will NOT prompt for any further invalid names.")
-                    
-                    else:
-                        ignoreOtherMissingNamesFlag = False
-                        print("Will continue to prompt for further invalid names.")
+        for time in times:
+            row = self.byName.get(time[0])
+            if row is None:
+                missing.append(time)
+                continue
             
-            print(f"ERROR IGNORED. Continuing operation. Entry ignored: \n\t{time}\t{eventName}")
+            formattedTime = normalize_duration(time[1])
+            if row[eventIndex] == '':
+                new += 1
+            elif force_write or parse_duration(formattedTime) < parse_duration(row[eventIndex]):
+                updated += 1
+            else:
+                continue
+            row[eventIndex] = formattedTime
+            if applied is not None:
+                applied.append([time[0], formattedTime])
+        
+        return new, updated, missing
+
+def handleMissingName(time: list[str], eventName: str, registry: SwimmerRegistry | None = None):
+    global ignoreOtherMissingNamesFlag
+    
+    learned = registry is not None and registry.resolve(time[0]) == IGNORED  # Already answered in an earlier run
+    if missingNamePolicy == "abort" and not learned:
+        raise Exception(f"Execution stopped due to missing name: {time[0]}")
+    
+    if missingNamePolicy == "prompt" and not learned and (ignoreOtherMissingNamesFlag == False or ignoreOtherMissingNamesFlag is None):
+        c = input(f"Unable to find '{time[0]}' in CSV. Continue with operation? (y/n) ").lower().strip()
+        
+        if c in {"n", "no"}:
+            raise Exception(f"Execution stopped due to missing name: {time[0]}")
+        
+        elif c in {"y", "yes"} and ignoreOtherMissingNamesFlag is None:
+            c = input(f"Hide prompt warning for future missing names? (y/n) ").lower().strip()
+            
+            if c in {"y", "yes"}:
+                ignoreOtherMissingNamesFlag = True
+                print("Will NOT prompt for any further invalid names.")
+            
+            else:
+                ignoreOtherMissingNamesFlag = False
+                print("Will continue to prompt for further invalid names.")
+        
+        if registry is not None and registry.resolve(time[0]) is None:
+            registry.ignore(time[0])  # Don't ask about this name again
+    
+    ignored_entries.append([time[0], time[1], eventName])
+    log.debug(f"ERROR IGNORED. Continuing operation. Entry ignored: \n\t{time}\t{eventName}")
+
+def writeEventToCSV(eventName : str, csvData : list[list[str]], times : list[list[str]], force_write: bool = False, table: BestTimeTable | None = None,
+                    registry: SwimmerRegistry | None = None, applied: list | None = None):
+    global new_times, updated_times
+    
+    if table is None:
+        table = BestTimeTable(csvData)
+    
+    new, updated, missing = table.applyEvent(eventName, times, force_write, applied)
+    new_times += new
+    updated_times += updated
+    metrics.count(eventName, "rows_matched", len(times) - len(missing))
+    metrics.count(eventName, "rows_rejected", len(missing))
+    metrics.count(eventName, "new_times", new)
+    metrics.count(eventName, "updated_times", updated)
+    
+    for time in missing:
+        handleMissingName(time, eventName, registry)
     
     return csvData
 
-def getPDFData(pdf_folder_name: str):
-    print(f"Grabbing files from folder: {pdf_folder_name}")
+def decodeResultFile(path: str):
+    """Decodes one saved result file. Runs in worker processes, so errors are returned, not raised.
+
+    Returns:
+        tuple: ((event, times), None, parse ms) on success, or (None, error message, parse ms) on failure.
+    """
+    st = monotonic()
+    try:
+        if path[-4:] == ".pdf":
+            result = extractTimes(*readPDFFile(path))
+        else:
+            result = readHTMLFile(path)
+        return result, None, round((monotonic() - st) * 1000, 3)
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}", round((monotonic() - st) * 1000, 3)
+
+def getPDFData(pdf_folder_name: str, parallel: bool = False):
+    return decodeFolders([pdf_folder_name], parallel)[pdf_folder_name]
+
+def decodeFolders(folders: list[str], parallel: bool = False):
+    """Decodes the result files of several folders, sharing one process pool when parallel.
+
+    Returns:
+        dict: Each folder mapped to its list of (event, times), in file name order.
+    """
+    manifest = loadCacheManifest()
+    files = {}
+    results = {}
+    pending = []
+    reused = 0
     
-    files = os.listdir(pdf_folder_name)
-    data = []
+    for folder in folders:
+        log.info(f"Grabbing files from folder: {folder}")
+        names = sorted(os.listdir(folder)) if os.path.isdir(folder) else []
+        files[folder] = [f"{folder}/{name}" for name in names if not os.path.isdir(f"{folder}/{name}")]
+        
+        if len(files[folder]) == 0:
+            log.warning(f"No files found in {folder}.")
+            continue
+        else:
+            log.info(f"Found {len(files[folder])} files in {folder}.")
+        
+        for path in files[folder]:
+            if path[-4:] != ".pdf" and path[-5:] != ".html":
+                log.warning(f"Non-result file found in {folder}: {os.path.basename(path)}")
+                continue
+            
+            digest = fileDigest(path)
+            cached = cachedTimes(manifest, path, digest)
+            if cached is not None:
+                results[path] = cached
+                reused += 1
+                log.debug(f"Reused cached times for unchanged {path}")
+            else:
+                pending.append((path, digest))
     
-    if len(files) == 0:
-        print("WARNING: No files found in PDF folder.")
-        return data
+    paths = [path for path, _ in pending]
+    if parallel and len(paths) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        
+        workers = min(os.cpu_count() or 1, len(paths))
+        log.info(f"Decoding {len(paths)} file(s) across {workers} processes...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            outcomes = list(pool.map(decodeResultFile, paths, chunksize=max(1, len(paths) // (workers * 4))))
     else:
-        print(f"Found {len(files)} files in PDF folder.")
+        outcomes = [decodeResultFile(path) for path in paths]
     
-    for file in files:
-        if file[-4:] != ".pdf":
-            print(f"Warning: Non-PDF file found in PDF folder: {file}")
-            continue
-        data.append(extractTimes(readPDFFile(f"{pdf_folder_name}/{file}")))
-        print(f"Extracted times from {pdf_folder_name}/{file}")
+    failed = 0
+    for (path, digest), outcome in zip(pending, outcomes):
+        result = storeDecoded(manifest, path, digest, *outcome)
+        if result is None:
+            failed += 1
+        else:
+            results[path] = result
+    
+    saveCacheManifest(manifest)
+    log.info(f"Reused cached times for {reused} unchanged file(s).")
+    if failed:
+        log.warning(f"{failed} file(s) could not be decoded.")
+    
+    return {folder: [results[path] for path in files[folder] if path in results] for folder in folders}
+
+def cachedTimes(manifest, path, digest):
+    """The times parsed earlier from this exact file, or None if it changed since."""
+    entry = manifest.get(manifestKey(path), {})
+    if entry.get("file_sha256") == digest and "times" in entry:
+        return entry["event"], entry["times"]
+    return None
+
+def storeDecoded(manifest, path, digest, result, error, parse_ms):
+    """Records one decodeResultFile outcome in the manifest and metrics. Returns the result, or None on failure."""
+    key = manifestKey(path)
+    label = os.path.splitext(key)[0]
+    metrics.count(label, "parse_ms", parse_ms)
+    if error is not None:
+        metrics.count(label, "decode_failed")
+        log.error(f"Could not decode {path}, skipping it. ({error})")
+        return None
+    
+    entry = manifest.get(key, {})
+    entry.update(file=os.path.basename(path), file_sha256=digest, event=result[0], times=result[1])
+    manifest[key] = entry
+    metrics.count(label, "rows_parsed", len(result[1]))
+    log.debug(f"Extracted times from {path}")
+    return result
+
+def streamFolder(folder: str):
+    """Yields (event, times) for each saved result file as it is decoded, one file at a time."""
+    manifest = loadCacheManifest()
+    try:
+        for name in sorted(os.listdir(folder)) if os.path.isdir(folder) else []:
+            path = f"{folder}/{name}"
+            if os.path.isdir(path):
+                continue
+            if path[-4:] != ".pdf" and path[-5:] != ".html":
+                log.warning(f"Non-result file found in {folder}: {name}")
+                continue
+            
+            digest = fileDigest(path)
+            result = cachedTimes(manifest, path, digest)
+            if result is None:
+                result = storeDecoded(manifest, path, digest, *decodeResultFile(path))
+            else:
+                log.debug(f"Reused cached times for unchanged {path}")
+            if result is not None:
+                yield result
+    finally:
+        saveCacheManifest(manifest)
+
+def streamDownloads(combos, teams, failed: list):
+    """Downloads every team's events and yields (team, (event, times)) as each one is parsed.
+
+    Workers download and parse in parallel and hand results over through a queue of
+    stream_queue_size, so slow merging holds back the workers instead of piling up
+    parsed events. Events that fail to download are appended to `failed`; a copy saved
+    by an earlier run is still used if there is one.
+    """
+    jobs = eventJobs(combos, teams)
+    workers = max(1, max_concurrent_downloads)
+    limiter = HostRateLimiter(requests_per_host_per_second, max_downloads_per_host)
+    manifest = loadCacheManifest()
+    results = queue.Queue(maxsize=max(1, stream_queue_size))
+    stopped = threading.Event()
+    inMemory = not use_html_parser and render_in_memory
+    archiver = AsyncArchiver() if inMemory and archive_pdfs else None
+    
+    def work(team, url, path, cached):
+        item = {"team": team, "path": path, "entry": None, "download_error": None, "digest": None, "outcome": None, "times": None}
+        try:
+            if inMemory:
+                item["entry"] = renderEventInMemory(url, path, cached, session, limiter, archiver)
+            else:
+                item["entry"] = downloadEvent(url, path, cached, session, limiter)
+        except Exception as e:
+            item["download_error"] = f"{type(e).__name__}: {e}"
+        try:
+            if inMemory:
+                source = item["entry"] or cached or {}
+                if "times" in source:
+                    item["times"] = (source["event"], source["times"])
+            elif os.path.exists(path) and not stopped.is_set():
+                item["digest"] = fileDigest(path)
+                if item["entry"] is None and cached is not None and cached.get("file_sha256") == item["digest"] and "times" in cached:
+                    item["times"] = (cached["event"], cached["times"])
+                else:
+                    item["outcome"] = decodeResultFile(path)
+        except Exception as e:
+            # Every job must hand over exactly one item, or the consumer waits for it forever.
+            item["outcome"] = (None, f"{type(e).__name__}: {e}", 0)
+        # Give up once the consumer has stopped, or the main thread has exited without closing the stream.
+        while not stopped.is_set() and threading.main_thread().is_alive():
+            try:
+                results.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+    
+    unchanged = 0
+    with createSession(workers) as session, ThreadPoolExecutor(max_workers=workers) as pool:
+        for team, url, path in jobs:
+            pool.submit(work, team, url, path, manifest.get(manifestKey(path)))
+        
+        try:
+            for done in range(1, len(jobs) + 1):
+                item = results.get()
+                key = manifestKey(item["path"])
+                eventName = os.path.splitext(key)[0]
+                if item["download_error"] is not None:
+                    failed.append(eventName)
+                    metrics.count(eventName, "download_failed")
+                    log.warning(f"Failed {eventName} ({done}/{len(jobs)}): {item['download_error']}")
+                elif item["entry"] is None:
+                    unchanged += 1
+                    metrics.count(eventName, "unchanged")
+                    log.debug(f"Unchanged {eventName} ({done}/{len(jobs)})")
+                else:
+                    manifest[key] = item["entry"]
+                    log.debug(f"Finished {eventName} ({done}/{len(jobs)})")
+                
+                result = item["times"]
+                if item["outcome"] is not None:
+                    result = storeDecoded(manifest, item["path"], item["digest"], *item["outcome"])
+                if result is not None:
+                    yield item["team"], result
+        finally:
+            stopped.set()
+            pool.shutdown(cancel_futures=True)
+            if archiver is not None:
+                archiver.close()
+            saveCacheManifest(manifest)
+    
+    log.info(f"{unchanged} of {len(jobs)} event(s) unchanged since the last download.")
+    if failed:
+        log.warning(f"{len(failed)} event(s) failed to download: {', '.join(sorted(failed))}")
+
+def addTeamTimes(best, event, times):
+    """Keeps each swimmer's best time per event, for teams without a roster here."""
+    for name, time in times:
+        formatted = normalize_duration(time)
+        row = best.setdefault(name, {})
+        if event not in row or parse_duration(formatted) < parse_duration(row[event]):
+            row[event] = formatted
+
+def writeTeamSheet(team, best):
+    sheet = [list(timeSheetHeader)] + [
+        [name, ''] + [best[name].get(event, '') for event in timeSheetHeader[2:]]
+        for name in sorted(best)
+    ]
+    os.makedirs(team_output_folder_name, exist_ok=True)
+    writeCSV(f"{team_output_folder_name}/{teamSlug(team)}.csv", sheet)
+    log.info(f"Wrote {len(sheet) - 1} swimmer(s) for {team[1]} to {team_output_folder_name}/{teamSlug(team)}.csv")
+
+def outputTeamData(teams):
+    """Decodes every other team's results in one pool and writes a best-time sheet per team."""
+    others = [team for team in teams if team != home_team]
+    if not others:
+        return
+    
+    log.info(f"Decoding results for {len(others)} other team(s)...")
+    with metrics.stage("decode teams"):
+        data = decodeFolders([teamFolder(team) for team in others], parallel=True)
     
-    return data
+    for team in others:
+        best = {}
+        for event, times in data[teamFolder(team)]:
+            addTeamTimes(best, event, times)
+        writeTeamSheet(team, best)
 
 def downloadPDFs():
     ensureNeededFiles()  # Ensure the folder exists
-    print("Creating event parameters...")
+    log.info("Creating event parameters...")
     events = createEventParameters()
-    print("Beginning event data fetch...")
-    getAllEvents(events)
-    print("Event data download complete.")
+    teams = readTeams()
+    log.info(f"Beginning event data fetch for {len(teams)} team(s)...")
+    with metrics.stage("download"):
+        failed = getAllEvents(events, teams)
+    log.info("Event data download complete.")
+    return failed
 
-def outputDataToCSV():
+def outputDataToCSV(timeData=None):
+    """Merges decoded events into the master sheet and writes it out.
+
+    Args:
+        timeData: Any iterable of (event, times). Events are merged as they are produced,
+            so a stream such as streamFolder or streamDownloads is never held in memory
+            whole. Defaults to the saved files of the home team.
+    """
     ensureNeededFiles()
-    print("Decoding PDF Data...")
-    timeData = getPDFData(pdf_folder_name)  # Decode PDF data
+    fromDisk = timeData is None
+    if fromDisk and parallel_decode:
+        log.info("Decoding PDF Data...")
+        with metrics.stage("decode"):
+            timeData = getPDFData(pdf_folder_name, parallel=True)  # Decode PDF data
+    elif fromDisk:
+        log.info(f"Decoding PDF Data from {pdf_folder_name} as it is merged...")
+        timeData = streamFolder(pdf_folder_name)
     
-    print("Retrieving master swimmer list...")
+    log.info("Retrieving master swimmer list...")
     sList = getSwimmerList(swimmer_info_file_name)  # Retrieve swimmer list
     
-    print("Sanitizing times from swimmer list...")
-    timeData = [(event, sanitize_entries(race, sList)) for (event, race) in timeData]  # Sanitize times
-    
-    print("Reading CSV data...")
-    timeCSV = readCSV(csv_output_file_name)
+    store = openTimeStore()
+    log.info("Reading CSV data...")
+    timeCSV = readTimeSheet(store)
     
-    print("Cleaning time-list data...")
+    log.info("Cleaning time-list data...")
     timeCSV = cleanUpCSV(sList, timeCSV)
+    if store is not None:
+        store.sync_roster([row[:2] for row in timeCSV[1:]])
+    
+    registry = openSwimmerRegistry(sList)
+    nameIndex = NameIndex(sList)
     
-    print("Adding times to time-list...")
-    for chunk in timeData:
-        timeCSV = writeEventToCSV(chunk[0], timeCSV, chunk[1])
-        print(f"Finished writing {chunk[0]}.")
+    log.info("Sanitizing and adding times to time-list...")
+    with metrics.stage("merge"):
+        table = BestTimeTable(timeCSV)
+        try:
+            for event, race in timeData:
+                unknown = []
+                kept = sanitize_entries(race, sList, registry, unknown)  # Sanitize times
+                kept += resolveUnknownNames(unknown, event, registry, nameIndex)
+                metrics.count(event, "rows_rejected", len(race) - len(kept))
+                applied = []
+                timeCSV = writeEventToCSV(event, timeCSV, kept, table=table, registry=registry, applied=applied)
+                if store is not None:
+                    store.record_event(event, applied, source="team results")
+                log.debug(f"Finished writing {event}.")
+        finally:
+            if hasattr(timeData, "close"):
+                timeData.close()  # A stream stops its downloads and workers even when merging fails
+    if ignored_entries:
+        log.info(f"Ignored {len(ignored_entries)} time(s) for swimmers not on the sheet.")
+    
+    log.info("Writing time-list to CSV...")
+    with metrics.stage("write"):
+        with open(csv_output_file_name, 'w', newline='') as csvfile:
+            csvwriter = csv.writer(csvfile)
+            csvwriter.writerows(timeCSV)
+        registry.save()
+        if store is not None:
+            store.close()
+    log.info("Write complete.")
     
-    print("Writing time-list to CSV...")
-    with open(csv_output_file_name, 'w', newline='') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        csvwriter.writerows(timeCSV)
-    print("Write complete.")
+    if fromDisk:
+        outputTeamData(readTeams())
+
+def refreshResults():
+    """Full run: each event is parsed and merged as soon as its download finishes.
+
+    Returns:
+        list: The events that failed to download.
+    """
+    ensureNeededFiles()
+    teams = readTeams()
+    failed = []
+    teamBest = {team: {} for team in teams if team != home_team}
+    
+    def homeEvents():
+        # Closing this generator closes the download stream too, which stops its workers.
+        with closing(streamDownloads(createEventParameters(), teams, failed)) as stream:
+            for team, result in stream:
+                if team == home_team:
+                    yield result
+                else:
+                    addTeamTimes(teamBest[team], *result)
+    
+    log.info(f"Streaming event results for {len(teams)} team(s)...")
+    with metrics.stage("refresh"), closing(homeEvents()) as events:
+        outputDataToCSV(events)
+    for team, best in teamBest.items():
+        writeTeamSheet(team, best)
+    return failed
+
+class ManualEntrySession:
+    """Keeps the time sheet in memory for a whole manual entry session.
+
+    Every entry is appended to a journal file first, so a crash loses nothing; the next
+    session replays the journal. The CSVs are only rewritten by flush(), which runs when
+    the session ends, and otherwise at the start of a prompt cycle or after an entry or
+    undo once manual_flush_interval seconds have passed since the last one. Nothing is
+    saved while a prompt is waiting for input, but the journal already holds every entry.
+    """
+    
+    def __init__(self):
+        self.store = openTimeStore()
+        self.timeCSV = readTimeSheet(self.store)
+        self.swimmerInfo = [[row[0], row[1]] for row in self.timeCSV[1:] if row[0] and row[1]]
+        self.timeCSV = cleanUpCSV(self.swimmerInfo, self.timeCSV)
+        self.table = BestTimeTable(self.timeCSV)
+        self.nameIndex = NameIndex(self.swimmerInfo)
+        self.registry = openSwimmerRegistry()
+        self.undoStack = deque(maxlen=manual_undo_limit)
+        self.rosterChanges = {}  # name -> division to add to the swimmer list, or None to remove
+        self.dirty = False
+        self.lastFlush = monotonic()
+        
+        recovered = self.replayJournal()
+        if recovered:
+            print(f"Recovered {recovered} unsaved entries from {manual_journal_file_name}.")
+            self.flush()
+    
+    def existingTime(self, name: str, event: str):
+        row = self.table.byName.get(name)
+        return row[self.table.column(event)] if row is not None else ''
+    
+    def addSwimmer(self, name: str, division: str):
+        row = [name, division] + [''] * (len(self.timeCSV[0]) - 2)
+        self.timeCSV.append(row)
+        self.table.byName[name] = row
+        self.swimmerInfo.append([name, division])
+        self.nameIndex = NameIndex(self.swimmerInfo)
+        self.rosterChanges[name] = division
+        if self.store is not None:
+            self.store.add_swimmer(name, division)
+    
+    def removeSwimmer(self, name: str):
+        row = self.table.byName.pop(name)
+        self.timeCSV.remove(row)
+        self.swimmerInfo = [s for s in self.swimmerInfo if s[0] != name]
+        self.nameIndex = NameIndex(self.swimmerInfo)
+        self.rosterChanges[name] = None
+        if self.store is not None:
+            self.store.remove_swimmer(name)
+    
+    def stored(self, entry: dict):
+        # The store commits each entry as it is made, so a replayed journal is mostly there already.
+        return self.store.is_latest(entry["name"], entry["event"], entry["time"], source="manual entry")
+    
+    def apply(self, entry: dict, replaying: bool = False):
+        if entry["new_swimmer"] and entry["name"] not in self.table.byName:
+            self.addSwimmer(entry["name"], entry["division"])
+        writeEventToCSV(entry["event"], self.timeCSV, [[entry["name"], entry["time"]]], force_write=True, table=self.table, registry=self.registry)
+        if self.store is not None and not (replaying and self.stored(entry)):
+            self.store.record_event(entry["event"], [[entry["name"], entry["time"]]], source="manual entry", force_write=True)
+    
+    def revert(self, entry: dict, replaying: bool = False):
+        if entry["new_swimmer"]:
+            self.removeSwimmer(entry["name"])
+        else:
+            self.table.byName[entry["name"]][self.table.column(entry["event"])] = entry["previous"]
+            if self.store is not None and not (replaying and not self.stored(entry)):
+                self.store.restore_best(entry["name"], entry["event"], entry["previous"], source="manual entry")
+    
+    def journal(self, record: dict):
+        with open(manual_journal_file_name, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def replayJournal(self):
+        if not os.path.exists(manual_journal_file_name):
+            return 0
+        
+        replayed = 0
+        with open(manual_journal_file_name, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # Torn final line from a crash mid-write
+                if "undo" in record:
+                    self.revert(record["undo"], replaying=True)
+                else:
+                    self.apply(record, replaying=True)
+                replayed += 1
+        self.dirty = replayed > 0
+        return replayed
+    
+    def record(self, name: str, division: str, event: str, time: str, new_swimmer: bool):
+        entry = {
+            "name": name,
+            "division": division,
+            "event": event,
+            "time": time,
+            "previous": self.existingTime(name, event),
+            "new_swimmer": new_swimmer,
+        }
+        self.journal(entry)
+        self.apply(entry)
+        self.undoStack.append(entry)
+        self.dirty = True
+        self.flushIfDue()
+    
+    def undo(self):
+        if not self.undoStack:
+            return None
+        entry = self.undoStack.pop()
+        self.journal({"undo": entry})
+        self.revert(entry)
+        self.dirty = True
+        self.flushIfDue()
+        return entry
+    
+    def flushIfDue(self):
+        if monotonic() - self.lastFlush >= manual_flush_interval:
+            self.flush()
+    
+    def flush(self):
+        self.lastFlush = monotonic()
+        self.registry.save()  # Names learned during an import are kept even if no times changed
+        if not self.dirty:
+            return
+        
+        self.timeCSV[1:] = sorted(self.timeCSV[1:], key=lambda x: x[0])
+        writeCSV(csv_output_file_name, self.timeCSV)
+        
+        if self.rosterChanges:
+            name_list = readCSV(swimmer_info_file_name)
+            header, rows = name_list[:1], [row for row in name_list[1:] if row and row[0] not in self.rosterChanges]
+            rows += [[name, division] for name, division in self.rosterChanges.items() if division is not None]
+            writeCSV(swimmer_info_file_name, header + rows)
+            self.rosterChanges = {}
+            self.registry.sync([[row[0], row[1]] for row in rows if len(row) > 1 and row[0]])
+            self.registry.save()
+        
+        if os.path.exists(manual_journal_file_name):
+            os.remove(manual_journal_file_name)
+        self.dirty = False
+        print(f"Saved manual entries to {csv_output_file_name}.")
 
 def manualEntryPrompt():
     print("\nEntering Manual Entry Mode.\n")
     print("Type 'q' at any prompt to quit, or 'r' to restart your current entry.")
+    print(f"Type 'u' at the name prompt to undo the last entry (up to {manual_undo_limit}).")
     print("Prefix name or event with '*' to persist across entries.")
     print("Example: '*John Doe' will persist name, which can be auto-entered if an input is left blank.")
+    
+    session = ManualEntrySession()
+    try:
+        manualEntryLoop(session)
+    finally:
+        session.flush()
+        if session.store is not None:
+            session.store.close()
 
+def manualEntryLoop(session: ManualEntrySession):
     persistent_name = None
     persistent_event = None
 
     while True:
+        session.flushIfDue()  # Entries made before a long pause get saved once the next one starts
         name = input("\nMANUAL ENTRY - Enter swimmer's name: ").strip()
         
         if name.lower() == 'q':
@@ -415,6 +1463,14 @@ def manualEntryPrompt():
             print("Restarting current entry.")
             continue
         
+        if name.lower() == 'u':
+            undone = session.undo()
+            if undone is None:
+                print("Nothing to undo.")
+            else:
+                print(f"↩️ Undid {undone['time']} for {undone['name']} in {undone['event']}.")
+            continue
+        
         if name.startswith("*"):
             persistent_name = name[1:].strip()
             name = persistent_name
@@ -427,10 +1483,8 @@ def manualEntryPrompt():
                 print("No name provided and no persistent name set.")
                 continue
 
-        swimmer_info = getSwimmerList(csv_output_file_name, from_timelist=True)  # Load swimmer list
-        
         # Use fuzzy search for matching names
-        matches = name_fuzzy_search(name, swimmer_info)
+        matches = name_fuzzy_search(name, session.nameIndex)
         new_swimmer = False
         if len(matches) == 0:
             print(f"No swimmer found matching: {name}")
@@ -471,8 +1525,6 @@ def manualEntryPrompt():
             if division not in valids:
                 print("Division not found in valids.")
                 continue
-        
-        timeCSV = cleanUpCSV(swimmer_info + [[name, division]], readCSV(csv_output_file_name))
 
         event = input(
                 f"Enter event{' or time (E: '+persistent_event+')' 
@@ -506,9 +1558,7 @@ def manualEntryPrompt():
                     print("No event provided and no persistent event set. Restarting entry.")
                     continue
             
-            try:
-                event_index = timeCSV[0].index(event)
-            except ValueError:
+            if event not in session.table.columns:
                 print("Event not found.")
                 continue
             
@@ -522,43 +1572,20 @@ def manualEntryPrompt():
             continue
 
         try:
-            formatted_time = fixDurationFormatting(raw_time)
-
-            # Find or add swimmer row
-            row_found = False
-            for row in timeCSV:
-                if row[0] == name:
-                    row_found = True
-                    existing_time = row[event_index]
-                    break
-
-            if not row_found:
-                raise Exception(f"Swimmer {name} not found in timeCSV after cleanUpCSV. (Should be impossible)")
-
-            # Add swimmer to list for time pulling if new name
-            if new_swimmer:
-                name_list = readCSV(swimmer_info_file_name)
-                name_list.append([name, division])
-                writeCSV(swimmer_info_file_name, name_list)
+            formatted_time = normalize_duration(raw_time)
+            existing_time = session.existingTime(name, event)
             
             # Overwrite warning if applicable
-            should_write = True
             if existing_time:
-                new_secs = durationToTime(formatted_time)
-                existing_secs = durationToTime(existing_time)
-                if new_secs > existing_secs:
+                if parse_duration(formatted_time) > parse_duration(existing_time):
                     print(f"⚠️ Warning: {name}'s existing time for {event} is faster ({existing_time}) than new time ({formatted_time}).")
                     confirm = input("Do you want to overwrite it? (y/n): ").strip().lower()
                     if confirm not in {"y", "yes"}:
-                        should_write = False
                         print("Entry skipped.")
                         continue
-
-            if should_write:
-                timeCSV = writeEventToCSV(event, timeCSV, [[name, formatted_time]], force_write=True)
-                with open(csv_output_file_name, 'w', newline='') as csvfile:
-                    csv.writer(csvfile).writerows(timeCSV)
-                print(f"✅ Time {formatted_time} recorded for {name} in {event}.\n")
+            
+            session.record(name, division, event, formatted_time, new_swimmer and name not in session.table.byName)
+            print(f"✅ Time {formatted_time} recorded for {name} in {event}.\n")
 
         except Exception as e:
             print(f"❌ Error: {e}\n")
@@ -574,15 +1601,264 @@ What operation do you want to perform?
 """
 
 pdf_folder_name = "grabbed_pdfs"
+home_team = ("35", "Burnaby Mountain Mantas")  # (TEAM id, CODE) whose results feed the master sheet
+teams_file_name = "teams.csv"  # Optional "Team ID,Team Code" list of other teams to pull, e.g. for rankings
+team_output_folder_name = "team_times"  # One best-time sheet per other team
 swimmer_info_file_name = "swim_info.csv"
+swimmer_registry_file_name = "swimmer_registry.json"  # Swimmer IDs and the results-name spellings learned for them
 csv_output_file_name = "master_times.csv"
 
+max_concurrent_downloads = 6  # Worker threads sharing one keep-alive session, across all teams
+max_downloads_per_host = 4  # Requests in flight to any one host; 0 disables the cap
+requests_per_host_per_second = 8  # 0 disables rate limiting
+use_html_parser = True  # Save raw result pages and parse them directly; False renders PDFs as before
+render_in_memory = True  # In PDF mode, full runs render and parse each PDF in memory instead of via pdf_folder_name
+archive_pdfs = False  # Still keep those PDFs in pdf_folder_name, written in the background
+cache_manifest_file_name = "grabbed_pdfs_cache.json"  # Per-file hashes, HTTP validators and parsed times
+parallel_decode = False  # Spread decoding over a process pool sized to the CPU count
+stream_queue_size = 8  # Parsed events waiting to be merged during a full run before downloads pause
+
+manual_journal_file_name = "manual_entry_journal.jsonl"  # Unsaved manual entries, replayed after a crash
+manual_flush_interval = 120  # Seconds between CSV saves during manual entry
+manual_undo_limit = 10
+
+use_sqlite_store = False  # Keep best times and full history in SQLite; the CSV becomes an export
+sqlite_store_file_name = "best_times.db"
+
+log_level = "INFO"  # DEBUG also lists every file, event and ignored entry
+metrics_file_name = "run_metrics.jsonl"  # One JSON record appended per download/decode run; None disables
+prometheus_file_name = None  # Also write the latest run in Prometheus text format, e.g. "best_time_tracker.prom"
+
 new_times = 0
 updated_times = 0
+ignored_entries = []  # [name, time, event] results whose swimmer was not on the sheet
+removed_swimmers = []  # [name, division] rows dropped from the sheet by cleanUpCSV
+division_changes = []  # [name, old division, new division] rows cleanUpCSV moved to match the swimmer list
 ignoreOtherMissingNamesFlag = None
+skippedNames = set()  # Unrecognized results names left unanswered this run
+metrics = RunMetrics()
+
+# What to do instead of prompting; the batch command line uses the non-prompting choices.
+missingSwimmerPolicy = "prompt"  # Sheet rows not on the swimmer list: "prompt", "keep" or "remove"
+missingNamePolicy = "prompt"  # Results for names not on the sheet: "prompt", "ignore" or "abort"
+
+def resetRunCounters(command: str = ""):
+    global new_times, updated_times, ignored_entries, removed_swimmers, division_changes, skippedNames, metrics
+    new_times = 0
+    updated_times = 0
+    ignored_entries = []
+    removed_swimmers = []
+    division_changes = []
+    skippedNames = set()
+    metrics = RunMetrics(command)
+
+class LevelFormatter(logging.Formatter):
+    """Plain messages for progress, with the level name in front of warnings and errors."""
+    
+    def format(self, record):
+        message = super().format(record)
+        return f"{record.levelname}: {message}" if record.levelno >= logging.WARNING else message
+
+def configureLogging(level=None, stream=None):
+    logging.basicConfig(level=(level or log_level).upper(), format="%(message)s", stream=stream or sys.stdout, force=True)
+    for handler in logging.getLogger().handlers:
+        handler.setFormatter(LevelFormatter("%(message)s"))
+
+def finishRun(**outcome):
+    """Saves the metrics of a download/decode run. Returns the run record."""
+    record = metrics.record(**outcome)
+    try:
+        if metrics_file_name:
+            metrics.write_json(metrics_file_name, record)
+        if prometheus_file_name:
+            metrics.write_prometheus(prometheus_file_name, record)
+    except OSError as e:
+        log.warning(f"Could not save run metrics: {e}")
+    totals = record["totals"]
+    log.info(f"Run took {record['wall_ms'] / 1000:.1f} s: {totals.get('bytes_downloaded', 0)} bytes downloaded, "
+             f"{totals.get('rows_matched', 0)} rows matched, {totals.get('rows_rejected', 0)} rejected.")
+    return record
+
+def importTimesFile(filename: str, overwrite_slower: bool = False):
+    """Records times from a CSV of name, event, time[, division] rows without prompting.
+
+    Names are matched through the swimmer registry, so known spellings of a swimmer's name
+    work too; unknown names become new swimmers when a division is given and otherwise
+    follow missingNamePolicy. Returns the number of rows skipped.
+    """
+    rows = [row for row in readCSV(filename) if row and row[0]]
+    if rows and rows[0][0].strip().lower() == "name":
+        rows = rows[1:]
+    
+    skipped = 0
+    session = ManualEntrySession()
+    try:
+        for row in rows:
+            if len(row) < 3:
+                print(f"Skipping malformed row {row}: expected name, event and time.")
+                skipped += 1
+                continue
+            name, event, raw_time = row[0].strip(), row[1].strip().upper(), row[2].strip()
+            division = row[3].strip().upper() if len(row) > 3 else ""
+            if event not in session.table.columns:
+                print(f"Skipping {name}: unknown event '{event}'.")
+                skipped += 1
+                continue
+            
+            sid = session.registry.resolve(name)
+            if name not in session.table.byName and sid is not None and session.registry.is_active(sid):
+                name = session.registry.name_of(sid)
+            
+            new_swimmer = name not in session.table.byName
+            if new_swimmer and not division:
+                handleMissingName([name, raw_time], event, session.registry)
+                skipped += 1
+                continue
+            
+            formatted_time = normalize_duration(raw_time)
+            existing_time = session.existingTime(name, event)
+            if existing_time and parse_duration(formatted_time) > parse_duration(existing_time) and not overwrite_slower:
+                print(f"Skipping {name} {event} {formatted_time}: existing time {existing_time} is faster.")
+                skipped += 1
+                continue
+            
+            session.record(name, division, event, formatted_time, new_swimmer)
+    finally:
+        session.flush()
+        if session.store is not None:
+            session.store.close()
+    return skipped
+
+def describeRelays(relays, times, relay_type):
+    """Turns find_best_combo results into plain dicts for the batch summary."""
+    described = []
+    for label, (relay, total) in zip(relay_labels, relays or []):
+        if relay_type == "medley":
+            strokes = ["FLY", "BACK", "BREAST", "FREE"]
+            legs = [{"stroke": strokes[leg], "name": times[i][0], "time": format_duration(value)}
+                    for leg, (i, value) in enumerate(relay)]
+            legs = [legs[1], legs[2], legs[0], legs[3]]  # Swim order: back, breast, fly, free
+        else:
+            legs = [{"stroke": "FREE", "name": name, "time": format_duration(value)} for name, value in relay]
+        described.append({"relay": label, "legs": legs, "total": format_duration(total)})
+    return described
+
+def runCommandLine(argv: list[str]):
+    """Non-interactive entry point for scheduled refreshes. Returns the process exit code."""
+    global missingSwimmerPolicy, missingNamePolicy, parallel_decode, max_concurrent_downloads, prometheus_file_name
+    import argparse
+    
+    parser = argparse.ArgumentParser(prog="main.py", description="Best time tracker batch commands.")
+    parser.add_argument("--missing-swimmers", choices=["keep", "remove", "prompt"], default="keep",
+                        help="sheet rows whose swimmer is not in the swimmer list (default: keep)")
+    parser.add_argument("--missing-names", choices=["ignore", "abort", "prompt"], default="ignore",
+                        help="results for swimmers not on the sheet (default: ignore)")
+    parser.add_argument("--summary", metavar="FILE", help="write a JSON run summary to FILE ('-' for stdout)")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], type=str.upper, default=log_level,
+                        help=f"progress output on stderr (default: {log_level})")
+    parser.add_argument("--prometheus", metavar="FILE", help="also write the run metrics in Prometheus text format")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    download = commands.add_parser("download", help="download event results")
+    download.add_argument("--concurrency", type=int, default=max_concurrent_downloads)
+    decode = commands.add_parser("decode", help="decode downloaded results into the CSV")
+    decode.add_argument("--parallel", action="store_true", help="decode across a process pool")
+    refresh = commands.add_parser("refresh", help="download, then decode")
+    refresh.add_argument("--concurrency", type=int, default=max_concurrent_downloads)
+    manual = commands.add_parser("import", help="record times from a CSV of name,event,time[,division]")
+    manual.add_argument("file")
+    manual.add_argument("--overwrite-slower", action="store_true", help="replace faster existing times")
+    relay = commands.add_parser("relay", help="build the best relays for some divisions")
+    relay.add_argument("--divisions", nargs="+", required=True)
+    relay.add_argument("--type", choices=["medley", "freestyle"], default="medley")
+    relay.add_argument("--count", type=int, default=1, help="number of relays without shared swimmers")
+    relay.add_argument("--objective", choices=["combined", "lexicographic"], default="combined")
+    meet = commands.add_parser("meet", help="plan every relay of a meet at once")
+    meet.add_argument("--divisions", nargs="+", help="divisions with relay events (default: every division on the sheet)")
+    meet.add_argument("--count", type=int, default=1, help="relays per event (A, B, C...)")
+    meet.add_argument("--max-per-swimmer", type=int, default=2, help="most relays any one swimmer swims")
+    fit = commands.add_parser("fit-splits", help="fit the 100 -> 50 split conversion to the sheet")
+    fit.add_argument("--per-division", action="store_true", help="also fit each division with enough swimmers")
+    fit.add_argument("--min-pairs", type=int, help="swimmers with both times a fit needs")
+    
+    args = parser.parse_args(argv)
+    missingSwimmerPolicy = args.missing_swimmers
+    missingNamePolicy = args.missing_names
+    if getattr(args, "parallel", False):
+        parallel_decode = True
+    if getattr(args, "concurrency", None):
+        max_concurrent_downloads = args.concurrency
+    if args.prometheus:
+        prometheus_file_name = args.prometheus
+    configureLogging(args.log_level, sys.stderr)
+    
+    resetRunCounters(args.command)
+    summary = {"command": args.command, "ok": True}
+    # With the summary on stdout, whatever the commands print goes to stderr so the JSON stays parseable
+    try:
+        with redirect_stdout(sys.stderr) if args.summary == "-" else nullcontext():
+            if args.command == "download":
+                summary["failed_downloads"] = downloadPDFs()
+            if args.command == "decode":
+                outputDataToCSV()
+            if args.command == "refresh":
+                summary["failed_downloads"] = refreshResults()
+            if args.command == "import":
+                summary["skipped_rows"] = importTimesFile(args.file, args.overwrite_slower)
+            if args.command == "relay":
+                from split_model import load_split_model
+                rows = read_times(best_time_file)
+                times = get_swimtimes_bydiv([d.upper() for d in args.divisions], SplitTable(rows, load_split_model(rows)))
+                relays = find_best_combo(times, args.type, args.count, args.objective)
+                summary["relays"] = describeRelays(relays, times, args.type)
+            if args.command == "meet":
+                from split_model import load_split_model
+                rows = read_times(best_time_file)
+                splits = SplitTable(rows, load_split_model(rows))
+                events = meet_events(splits, max(1, min(args.count, len(relay_labels))))
+                if args.divisions:
+                    wanted = {d.upper() for d in args.divisions}
+                    events = [event for event in events if event["name"] in wanted]
+                plan = plan_meet_relays(splits, events, max(1, args.max_per_swimmer))
+                summary["meet"] = [{"event": event["name"], "type": event["type"], "relays": describeRelays(relays, times, event["type"])}
+                                   for event, times, relays in plan]
+                filled = sum(len(relays) for _, _, relays in plan)
+                log.info(f"Filled {filled} of {sum(event['count'] for event in events)} relays in {len(events)} event(s)")
+            if args.command == "fit-splits":
+                import split_model
+                rows = read_times(best_time_file)
+                model = split_model.load_split_model(rows, per_division=args.per_division, min_pairs=args.min_pairs)
+                summary["split_model"] = split_model.describe(rows, model)
+                for fit in summary["split_model"]:
+                    if fit["a"] is None:
+                        log.info(f"{fit['stroke']}: too few swimmers with both a 50 and a 100; using the default conversion")
+                    else:
+                        log.info(f"{fit['stroke']}: a={fit['a']} b={fit['b']} from {fit['pairs']} swimmer(s), "
+                                 f"mean error {fit['error_s']} s (default {fit['default_error_s']} s)")
+    except Exception as e:
+        summary["ok"] = False
+        summary["error"] = f"{type(e).__name__}: {e}"
+        log.error(summary["error"])
+    
+    summary.update(
+        new_times=new_times,
+        updated_times=updated_times,
+        ignored_entries=ignored_entries,
+        removed_swimmers=removed_swimmers,
+        division_changes=division_changes,
+    )
+    if args.command in {"download", "decode", "refresh"}:
+        summary["metrics"] = finishRun(ok=summary["ok"])
+    if args.summary == "-":
+        print(json.dumps(summary, indent=1))
+    elif args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=1)
+    return 0 if summary["ok"] else 1
 
 def main():
     global new_times, updated_times
+    configureLogging()
     while True:
         mode = input(modeprompt).strip()
         try:
@@ -594,18 +1870,19 @@ def main():
             print(f"Did not recognize input as number. Error: {e}")
             return
         
-        new_times = 0
-        updated_times = 0
+        resetRunCounters(f"mode {mode}")
         match mode:
             case 1:
-                downloadPDFs()
-                outputDataToCSV()
+                refreshResults()
+                finishRun()
                 print(f"New times added: {new_times}")
                 print(f"Updated times: {updated_times}")
             case 2:
                 downloadPDFs()
+                finishRun()
             case 3:
                 outputDataToCSV()
+                finishRun()
                 print(f"New times added: {new_times}")
                 print(f"Updated times: {updated_times}")
             case 4:
@@ -618,4 +1895,6 @@ def main():
                 return
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(runCommandLine(sys.argv[1:]))
     main()
\ No newline at end of file
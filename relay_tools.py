@@ -1,9 +1,13 @@
 import csv
+import heapq
 import os
 import itertools
 from time import perf_counter_ns as time
 
+from time_codec import MISSING, format_duration, parse_column, parse_duration
+
 best_time_file = "master_times.csv"
+meet_search_limit = 500  # Flow solves a group of linked meet events may take before keeping the best plan so far
 
 def read_times(file_path):
     times = []
@@ -17,37 +21,6 @@ def read_times(file_path):
     
     return times
 
-def durationToTime(time: str): 
-    # Assumes that the duration is formatted properly
-    key = [36000, 3600, None, 600, 60, None, 10, 1, None, 0.1, 0.01]  # Value in seconds of each digit of duration
-    
-    listtime = list(time)
-    
-    if len(listtime) != len(key):
-        raise Exception(f"Attempted to convert duration to time, but failed: '{time}' was not of proper length")
-    
-    total = 0.0
-    for i in range(len(key)):
-        if key[i] != None:
-            total += int(listtime[i]) * key[i]
-    
-    return round(total, 2)
-
-def timeToDuration(time: float) -> str:
-    if not isinstance(time, (float, int)):
-        raise TypeError("time must be a float or int")
-    if time < 0:
-        raise Exception(f"Attempted to convert invalid time to duration: {time}")
-    if time == 0:
-        return "00:00:00.00"
-    time = round(time, 2)
-    hours = int(time // 3600)
-    time %= 3600
-    minutes = int(time // 60)
-    seconds = int(time % 60)
-    dd = round(round(time - int(time), 2)*100)
-    return f"{hours:02}:{minutes:02}:{seconds:02}.{dd:02}"
-
 def choose_mode():
     # 1. Create relay by name
     # 2. Create relay by division
@@ -57,11 +30,12 @@ def choose_mode():
         1. Make ideal relay - name
         2. Make ideal relay - division
         3. Estimate relay time
+        4. Plan every relay for a meet
         Q. Quit\n"""
     mode = input(mode_prompt).strip()
 
     match mode:
-        case '1' | '2' | '3':
+        case '1' | '2' | '3' | '4':
             return int(mode)
         
         case '' | 'q' | 'quit':
@@ -101,56 +75,111 @@ def choose_divisions():
     
     return divs
 
-def hundred_to_fifty(time):
-    return timeToDuration(0.591428 * (durationToTime(time) ** 0.931986))
+default_split_coefficients = (0.591428, 0.931986)  # 50 = a * 100^b in seconds, for every stroke
 
-def get_swimmer_times(swimmer_name, csvtimes):
-    # Find swimmer in CSV
-    swimmer_index = 0
-    for row_ind in range(len(csvtimes)):
-        if csvtimes[row_ind][0].lower() == swimmer_name.lower():
-            swimmer_index = row_ind
-            break
-    else:
-        raise Exception(f"get_swimmer_times() couldn't find swimmer: {swimmer_name}")
-
-    key = ['Name','Div.','100IM','200IM','50FL','100FL','50BK','100BK','50BR','100BR','50FR','100FR']
-    swimmer_times : list[str | None] = [None] * 4
-
-    for i, stroke in enumerate(['FL', 'BK', 'BR', 'FR']):
-        # Get 50 time if it exists
-        fifty_time = csvtimes[swimmer_index][key.index(f'50{stroke}')]
-        if fifty_time and not (
-            (# Div 4+ and O2 swimmers cannot swim 50 BR or 50 BK
-                (
-                    len(csvtimes[swimmer_index][1]) == 2 and int(csvtimes[swimmer_index][1][0]) > 3  # Div 4+
-                    or len(csvtimes[swimmer_index][1]) == 3 and int(csvtimes[swimmer_index][1][1]) == 2  # O2
-                )
-                and (stroke == 'BR' or stroke == 'BK')
-            )):
-            swimmer_times[i] = fifty_time
-        else:
-            # If 50 time doesn't exist, get 100 time and divide by 2
-            hundred_time = csvtimes[swimmer_index][key.index(f'100{stroke}')]
-            if hundred_time:
-                swimmer_times[i] = hundred_to_fifty(hundred_time)
+def hundred_to_fifty(time, coefficients=default_split_coefficients):
+    # split_model fits (a, b) per stroke from the sheet; the default is the original hard-coded law
+    a, b = coefficients
+    seconds = parse_duration(time) / 100
+    return format_duration(round(100 * a * (seconds ** b)))
 
-    return swimmer_times
+relay_events = {'FL': ('50FL', '100FL'), 'BK': ('50BK', '100BK'), 'BR': ('50BR', '100BR'), 'FR': ('50FR', '100FR')}
 
-def get_swimtimes_bydiv(divs, csvtimes):
-    swimmer_names = []
-    for entry in csvtimes:
-        if (entry[1] in divs) and (entry[0] not in swimmer_names) and (entry[0]):
-            # Get names that match division list, avoiding duplicates
-            swimmer_names.append(entry[0])
+def no_short_back_breast(division):
+    # Div 4+ and O2 swimmers cannot swim 50 BR or 50 BK
+    return (len(division) == 2 and division[0].isdigit() and int(division[0]) > 3
+            or len(division) == 3 and division[0] == 'O' and division[1] == '2')
+
+class SplitTable:
+    # Relay splits for every swimmer on the sheet, built once per read_times load.
+    #  - rows: lowercased name -> row index (the first row wins, as with the old scan)
+    #  - columns: event -> column index
+    #  - splits: row index -> 50 splits for FL, BK, BR, FR, with 100 times already converted
+    #  - restricted: row indices of swimmers who cannot swim 50 BR or 50 BK
+    #  - divisions: division -> row indices of its swimmers, in sheet order, first row per name
+    # 'model' is a split_model.SplitModel for fitted 100 -> 50 conversions; without one the default law is used.
+    def __init__(self, csvtimes, model=None):
+        key = ['Name','Div.','100IM','200IM','50FL','100FL','50BK','100BK','50BR','100BR','50FR','100FR']
+        header = csvtimes[0] if csvtimes and csvtimes[0] and csvtimes[0][0] == 'Name' else key
+        self.columns = {event: i for i, event in enumerate(header)}
+        if any(event not in self.columns for pair in relay_events.values() for event in pair):
+            self.columns = {event: i for i, event in enumerate(key)}
+
+        self.csvtimes = csvtimes
+        self.model = model
+        self.rows = {}
+        self.splits = {}
+        self.restricted = set()
+        self.divisions = {}
+        seen = set()
+        for row_ind, row in enumerate(csvtimes):
+            if row_ind == 0 and header is not key:
+                continue
+            if not row or not row[0]:
+                continue
+            self.rows.setdefault(row[0].lower(), row_ind)
+            if len(row) > 1 and (row[1], row[0]) not in seen:
+                seen.add((row[1], row[0]))
+                self.divisions.setdefault(row[1], []).append(row_ind)
+
+        for row_ind in set(self.rows.values()):
+            row = csvtimes[row_ind]
+            if len(row) > 1 and no_short_back_breast(row[1]):
+                self.restricted.add(row_ind)
+            self.splits[row_ind] = self.row_splits(row, row_ind in self.restricted)
 
-    return get_swimtimes_byname(swimmer_names, csvtimes)
+    def cell(self, row, event):
+        i = self.columns[event]
+        return row[i] if i < len(row) else ''
+
+    def row_splits(self, row, restricted):
+        swimmer_times : list[str | None] = [None] * 4
+        division = row[1] if len(row) > 1 else None
+        for i, (stroke, (fifty, hundred)) in enumerate(relay_events.items()):
+            # Get 50 time if it exists
+            fifty_time = self.cell(row, fifty)
+            if fifty_time and not (restricted and stroke in ('BR', 'BK')):
+                swimmer_times[i] = fifty_time
+            else:
+                # If 50 time doesn't exist, get 100 time and convert it
+                hundred_time = self.cell(row, hundred)
+                if hundred_time:
+                    coefficients = self.model.coefficients(stroke, division) if self.model else default_split_coefficients
+                    swimmer_times[i] = hundred_to_fifty(hundred_time, coefficients)
+        return swimmer_times
+
+    def swimmer_times(self, swimmer_name):
+        row_ind = self.rows.get(swimmer_name.lower())
+        if row_ind is None:
+            raise Exception(f"get_swimmer_times() couldn't find swimmer: {swimmer_name}")
+        return list(self.splits[row_ind])
+
+    def names_in(self, divs):
+        names = []
+        seen = set()
+        for row_ind in sorted(i for div in set(divs) for i in self.divisions.get(div, [])):
+            name = self.csvtimes[row_ind][0]
+            if name not in seen:
+                seen.add(name)
+                names.append(name)
+        return names
+
+def get_swimmer_times(swimmer_name, csvtimes):
+    # 'csvtimes' is either a prebuilt SplitTable or the rows from read_times
+    table = csvtimes if isinstance(csvtimes, SplitTable) else SplitTable(csvtimes)
+    return table.swimmer_times(swimmer_name)
+
+def get_swimtimes_bydiv(divs, csvtimes):
+    table = csvtimes if isinstance(csvtimes, SplitTable) else SplitTable(csvtimes)
+    # Names that match the division list, in sheet order, without duplicates
+    return get_swimtimes_byname(table.names_in(divs), table)
 
 def get_swimtimes_byname(names, csvtimes):
+    table = csvtimes if isinstance(csvtimes, SplitTable) else SplitTable(csvtimes)
     swimmers = []
     for name in names:
         try:
-            swimmer_times = get_swimmer_times(name, csvtimes)
+            swimmer_times = table.swimmer_times(name)
             swimmers.append((name, swimmer_times))
         except Exception as e:
             print(e)
@@ -175,44 +204,126 @@ def levenshtein_distance(s1, s2):
 
     return previous_row[-1]
 
+def bounded_levenshtein_distance(s1, s2, limit):
+    # Same result as levenshtein_distance while it is <= limit; anything over the limit returns limit + 1.
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1
+    if len(s1) - len(s2) > limit:
+        return limit + 1
+    if len(s2) == 0:
+        return len(s1)
+
+    previous_row = range(len(s2) + 1)
+    for i, c1 in enumerate(s1):
+        current_row = [i + 1]
+        for j, c2 in enumerate(s2):
+            current_row.append(min(previous_row[j + 1] + 1, current_row[j] + 1, previous_row[j] + (c1 != c2)))
+        if min(current_row) > limit:
+            return limit + 1
+        previous_row = current_row
+
+    return min(previous_row[-1], limit + 1)
+
+def best_substring_distance(pattern_bits, pattern_length, text):
+    # Smallest edit distance between the pattern and any substring of 'text' (Myers' bit-parallel
+    # search). Never larger than the sliding-window distance, so it is a cheap lower bound.
+    # 'pattern_bits' maps each character to a bitmask of its positions in the pattern.
+    mask = (1 << pattern_length) - 1
+    high = 1 << (pattern_length - 1)
+    pv, mv, score = mask, 0, pattern_length
+    best = score
+    for c in text:
+        eq = pattern_bits.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        ph = (ph << 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+        if score < best:
+            best = score
+    return best
+
+class NameIndex:
+    # Prebuilt lookup structures for name_fuzzy_search, built once per session.
+    #  - exact: lowercased name -> first entry with that name
+    #  - grams: character bigram (and single character) -> ids of names containing it
+    # Substring matches must contain every bigram of the query, and a fuzzy match within
+    # distance k must share at least len(query) - 1 - 2k of the query's bigrams. Survivors are
+    # screened with best_substring_distance before the exact sliding-window distance.
+    def __init__(self, csvnames):
+        self.entries = [entry for entry in csvnames if entry[0]]
+        self.lowered = [entry[0].lower() for entry in self.entries]
+        self.exact = {}
+        self.grams = {}
+        for i, name in enumerate(self.lowered):
+            self.exact.setdefault(name, self.entries[i])
+            for gram in set(name) | {name[j:j + 2] for j in range(len(name) - 1)}:
+                self.grams.setdefault(gram, set()).add(i)
+
+    def substring_matches(self, name_lower):
+        grams = [name_lower[j:j + 2] for j in range(len(name_lower) - 1)] or [name_lower]
+        postings = sorted((self.grams.get(gram, set()) for gram in set(grams)), key=len)
+        ids = set.intersection(*postings) if postings else set()
+        return [self.entries[i] for i in sorted(ids) if name_lower in self.lowered[i]]
+
+    def fuzzy_candidates(self, name_lower, threshold):
+        required = len(name_lower) - 1 - 2 * threshold
+        if required <= 0:
+            return range(len(self.entries))
+        counts = {}
+        for j in range(len(name_lower) - 1):
+            for i in self.grams.get(name_lower[j:j + 2], ()):
+                counts[i] = counts.get(i, 0) + 1
+        return sorted(i for i, count in counts.items() if count >= required)
+
+    def search(self, name):
+        name_lower = name.lower()
+
+        # Try to match exact names first
+        if name_lower in self.exact:
+            return [self.exact[name_lower]]
+
+        # Try to match as a substring (allows partial input matches)
+        partial_matches = self.substring_matches(name_lower) if name_lower else list(self.entries)
+        if partial_matches:
+            return sorted(partial_matches)
+
+        # Fallback to fuzzy search using Levenshtein distance
+        matches = []
+        threshold = max(1, len(name_lower) // 3)  # Set a threshold based on the length of the input name
+        pattern_bits = {}
+        for j, c in enumerate(name_lower):
+            pattern_bits[c] = pattern_bits.get(c, 0) | (1 << j)
+        for i in self.fuzzy_candidates(name_lower, threshold):
+            candidate_lower = self.lowered[i]
+            if best_substring_distance(pattern_bits, len(name_lower), candidate_lower) > threshold:
+                continue
+            # Slide a window over candidate to compare to the input
+            if len(candidate_lower) >= len(name_lower):
+                windows = {candidate_lower[j:j + len(name_lower)] for j in range(len(candidate_lower) - len(name_lower) + 1)}
+                min_distance = min(bounded_levenshtein_distance(name_lower, window, threshold) for window in windows)
+            else:
+                min_distance = bounded_levenshtein_distance(name_lower, candidate_lower, threshold)
+            if min_distance <= threshold:
+                matches.append((min_distance, self.entries[i]))
+
+        return [[candidate[0], candidate[1]] for _, candidate in sorted(matches, key=lambda x: x[0])]
+
 def name_fuzzy_search(name, csvnames):
-    # Build list of candidate names
-    name_list = [entry for entry in csvnames if entry[0]]
-    name_lower = name.lower()
-    
-    # Try to match exact names first
-    exact_matches = [candidate for candidate in name_list if candidate[0].lower() == name_lower]
-    if exact_matches:
-        return [exact_matches[0]]
-
-    # Try to match as a substring (allows partial input matches)
-    partial_matches = [candidate for candidate in name_list if name_lower in candidate[0].lower()]
-    if partial_matches:
-        return sorted(partial_matches)
-
-    # Fallback to fuzzy search using Levenshtein distance
-    matches = []
-    threshold = max(1, len(name_lower) // 3)  # Set a threshold based on the length of the input name
-    # Iterate through candidates and calculate Levenshtein distance
-    for candidate in name_list:
-        candidate_lower = candidate[0].lower()
-        min_distance = float('inf')
-        # Slide a window over candidate to compare to the input
-        if len(candidate_lower) >= len(name_lower):
-            for i in range(len(candidate_lower) - len(name_lower) + 1):
-                window = candidate_lower[i:i+len(name_lower)]
-                d = levenshtein_distance(name_lower, window)
-                if d < min_distance:
-                    min_distance = d
-        else:
-            min_distance = levenshtein_distance(name_lower, candidate_lower)
-        if min_distance <= threshold:
-            matches.append((min_distance, candidate))
-    
-    return [[candidate[0], candidate[1]] for _, candidate in sorted(matches, key=lambda x: x[0])]
+    # 'csvnames' is either a prebuilt NameIndex or rows of [name, division, ...]
+    index = csvnames if isinstance(csvnames, NameIndex) else NameIndex(csvnames)
+    return index.search(name)
 
 def choose_names(csvtimes, input_mode, min_names=0, max_names=float('inf')):
     names = []
+    name_index = csvtimes if isinstance(csvtimes, NameIndex) else NameIndex(csvtimes)
     
     if input_mode not in [1, 2, 3]:
         raise ValueError("Invalid input mode for choosing names. (Internal error, should not happen)")
@@ -230,7 +341,7 @@ def choose_names(csvtimes, input_mode, min_names=0, max_names=float('inf')):
         name = input("\n" + input_prompt).strip()
         if not name:
             break
-        possible_matches = [match[0] for match in name_fuzzy_search(name, csvtimes)]
+        possible_matches = [match[0] for match in name_fuzzy_search(name, name_index)]
         if possible_matches:
             if len(possible_matches) == 1:
                 names.append(possible_matches[0])
@@ -261,18 +372,104 @@ def choose_names(csvtimes, input_mode, min_names=0, max_names=float('inf')):
     seen = set()
     return [name for name in names if not (name in seen or seen.add(name))]  # Remove duplicates
 
+def min_cost_assignment(cost):
+    # Hungarian algorithm. 'cost' has one row per leg and one column per swimmer (rows <= columns).
+    # None marks a swimmer who cannot swim that leg. Returns the chosen column for each row,
+    # or None if some row cannot be filled without an invalid entry. O(rows^2 * columns).
+    rows = len(cost)
+    cols = len(cost[0]) if rows else 0
+    if rows == 0 or rows > cols:
+        return None
+
+    invalid = 1 + sum(max((c for c in row if c is not None), default=0) for row in cost)  # Worse than any valid pick
+    weights = [[invalid if c is None else c for c in row] for row in cost]
+
+    u = [0] * (rows + 1)
+    v = [0] * (cols + 1)
+    owner = [0] * (cols + 1)  # owner[j] = row assigned to column j (1-based, 0 = free)
+    way = [0] * (cols + 1)
+    for i in range(1, rows + 1):
+        owner[0] = i
+        j0 = 0
+        min_slack = [float('inf')] * (cols + 1)
+        used = [False] * (cols + 1)
+        while True:
+            used[j0] = True
+            i0 = owner[j0]
+            delta = float('inf')
+            j1 = 0
+            row = weights[i0 - 1]
+            for j in range(1, cols + 1):
+                if not used[j]:
+                    slack = row[j - 1] - u[i0] - v[j]
+                    if slack < min_slack[j]:
+                        min_slack[j] = slack
+                        way[j] = j0
+                    if min_slack[j] < delta:
+                        delta = min_slack[j]
+                        j1 = j
+            for j in range(cols + 1):
+                if used[j]:
+                    u[owner[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_slack[j] -= delta
+            j0 = j1
+            if owner[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            owner[j0] = owner[j1]
+            j0 = j1
+
+    assignment = [0] * rows
+    for j in range(1, cols + 1):
+        if owner[j]:
+            assignment[owner[j] - 1] = j - 1
+    if any(cost[i][assignment[i]] is None for i in range(rows)):
+        return None
+    return assignment
+
 def find_minimum_sum_combination(times):
-    # 'times' is a list of tuples: (name, [float values])
+    # 'times' is a list of tuples: (name, [centisecond values])
+    # Solved as an assignment of legs to swimmers, polynomial in the number of swimmers.
+    if not times:
+        return None, None
+
+    time_lists = [entry[1] for entry in times]
+    cols = len(time_lists[0])
+    
+    # Verify that each entry has the same number of time columns.
+    if not all(len(t) == cols for t in time_lists):
+        print("All rows must have the same number of time columns.")
+        exit(1)
+    
+    # One cost row per leg, one column per swimmer.
+    cost = [[t[j] for t in time_lists] for j in range(cols)]
+    if any(all(value is None for value in leg) for leg in cost):
+        # If any column has no valid candidates, there is no valid combination.
+        return None, None
+    
+    assignment = min_cost_assignment(cost)
+    if assignment is None:
+        return None, None
+    
+    best_choice = tuple((i, time_lists[i][j]) for j, i in enumerate(assignment))
+    return best_choice, sum(value for _, value in best_choice)
+
+def find_minimum_sum_combination_bruteforce(times):
+    # Reference solver: tries every combination, O(n^4) for a medley. Kept for benchmarking.
+    # 'times' is a list of tuples: (name, [centisecond values])
     if not times:
         return None, None
 
-    # Extract the list of float values from each entry.
+    # Extract the list of time values from each entry.
     time_lists = [entry[1] for entry in times]
     cols = len(time_lists[0])
     
-    # Verify that each entry has the same number of float columns.
+    # Verify that each entry has the same number of time columns.
     if not all(len(t) == cols for t in time_lists):
-        print("All rows must have the same number of float columns.")
+        print("All rows must have the same number of time columns.")
         exit(1)
         
     rows = len(times)
@@ -304,56 +501,397 @@ def find_minimum_sum_combination(times):
 
     return best_choice, min_sum
 
-def find_best_combo(times, relay_type):
+relay_labels = "ABCDEFGHIJ"
+
+def find_disjoint_medleys(times, relay_count, objective="combined"):
+    # Builds up to 'relay_count' medley relays that share no swimmers.
+    # 'combined' minimizes the summed time of all relays in one assignment solve;
+    # 'lexicographic' makes the A relay as fast as possible, then B from who is left, and so on.
+    # Returns a list of (best_choice, min_sum) in relay order (A first).
+    if objective == "lexicographic":
+        relays = []
+        remaining = list(range(len(times)))
+        for _ in range(relay_count):
+            best_choice, min_sum = find_minimum_sum_combination([times[i] for i in remaining])
+            if best_choice is None:
+                break
+            best_choice = tuple((remaining[i], value) for i, value in best_choice)
+            relays.append((best_choice, min_sum))
+            used = {i for i, _ in best_choice}
+            remaining = [i for i in remaining if i not in used]
+        return relays
+
+    # Each leg appears once per relay; each swimmer can fill at most one leg overall.
+    for count in range(min(relay_count, len(times) // 4), 0, -1):
+        cost = [[entry[1][leg] for entry in times] for leg in range(4) for _ in range(count)]
+        assignment = min_cost_assignment(cost)
+        if assignment is None:
+            continue
+        # Give the fastest swimmer on each leg to A, the next to B, and so on.
+        legs = [sorted(assignment[leg * count:(leg + 1) * count], key=lambda i: times[i][1][leg]) for leg in range(4)]
+        relays = []
+        for k in range(count):
+            best_choice = tuple((legs[leg][k], times[legs[leg][k]][1][leg]) for leg in range(4))
+            relays.append((best_choice, sum(value for _, value in best_choice)))
+        return relays
+    return []
+
+def find_disjoint_free_relays(times, relay_count):
+    # Sorting and taking swimmers four at a time is optimal for both combined and A-first objectives.
+    # Returns a list of ([(name, time), ...] in swim order, total) with the fastest swimmer anchoring.
+    free_times = [(entry[0], entry[1][3]) for entry in times if entry[1][3] is not None]
+    free_times.sort(key=lambda x: x[1])
+    relays = []
+    for k in range(min(relay_count, len(free_times) // 4)):
+        relay = free_times[k * 4:(k + 1) * 4]
+        relay.insert(3, relay.pop(0))  # Move the fastest swimmer to the end (4th position)
+        relays.append((relay, sum(i[1] for i in relay)))
+    return relays
+
+def split_centiseconds(times):
+    # (name, [split strings]) -> (name, [centiseconds or None]), parsing one stroke column at a time
+    columns = [parse_column(entry[1][j] for entry in times) for j in range(4)]
+    return [(entry[0], [int(col[i]) if col[i] != MISSING else None for col in columns]) for i, entry in enumerate(times)]
+
+def print_relays(times, relays, relay_type, single=False, prefix=""):
+    # The default order in the input grid corresponds to these strokes:
+    default_strokes = ["FLY", "BACK", "BREAST", "FREE"]
+    # Specify desired output order here (e.g., ["BACK", "BREAST", "FLY", "FREE"])
+    output_strokes = ["BACK", "BREAST", "FLY", "FREE"]
+    
+    for label, (relay, total) in zip(relay_labels, relays):
+        if single:
+            print(f"\nBest {relay_type} relay combination:")
+        else:
+            print(f"\n{prefix}{label} {relay_type} relay:")
+        if relay_type == "medley":
+            for stroke in output_strokes:
+                row_index, time_value = relay[default_strokes.index(stroke)]
+                print(f"{stroke}: {times[row_index][0]}, time {format_duration(time_value)}")
+        else:
+            for swimmer, time in relay:
+                print(f"FREE: {swimmer}, time {format_duration(time)}")
+        print(f"\nTotal relay time: {format_duration(total)}")
+
+def find_best_combo(times, relay_type, relay_count=1, objective="combined"):
     # Minimum number of swimmers is 4, one for each stroke.
     if len(times) < 4:
         print("Not enough swimmers to form a relay team. At least 4 swimmers are required.")
         return
     
-    # Convert string times to float values.    
-    for i in range(len(times)):
-        times[i] = (times[i][0], [durationToTime(t) if t else None for t in times[i][1]])
+    # Convert string times to centiseconds, one stroke column at a time.
+    times[:] = split_centiseconds(times)
     
     if relay_type == "medley":
-        # The default order in the input grid corresponds to these strokes:
-        default_strokes = ["FLY", "BACK", "BREAST", "FREE"]
-        # Specify desired output order here (e.g., ["BACK", "BREAST", "FLY", "FREE"])
-        output_strokes = ["BACK", "BREAST", "FLY", "FREE"]
-
-        best_choice, min_sum = find_minimum_sum_combination(times)
+        relays = find_disjoint_medleys(times, relay_count, objective)
         
-        if best_choice is None or min_sum is None:
-            print("No valid combination exists (one stroke has no valid float values).")
+        if not relays:
+            print("No valid combination exists (one stroke has no valid times).")
             return
-        else:
-            # Reorder the chosen combination to match the desired output order.
-            ordered_choice = []
-            for stroke in output_strokes:
-                idx = default_strokes.index(stroke)
-                ordered_choice.append(best_choice[idx])
-            
-            print("\nBest medley relay combination:")
-            # print(list(zip(output_strokes, ordered_choice)))
-            for stroke in output_strokes:
-                idx = default_strokes.index(stroke)
-                row_index, time_value = best_choice[idx]
-                swimmer_name = times[row_index][0]
-                print(f"{stroke}: {swimmer_name}, time {timeToDuration(time_value)}")
-            print(f"\nTotal relay time: {timeToDuration(min_sum)}")
     else:
         # For freestyle, we just need to sort by the freestyle times.
-        free_times = [(entry[0], entry[1][3]) for entry in times]  # Get only the freestyle times
-        free_times = [entry for entry in free_times if entry[1] is not None]  # Filter out None values
-        if len(free_times) < 4:
+        relays = find_disjoint_free_relays(times, relay_count)
+        if not relays:
             print("Not enough swimmers with valid freestyle times to form a relay team.")
             return
-        # Sort by freestyle time
-        free_times.sort(key=lambda x: x[1])
-        free_times.insert(3, free_times.pop(0))  # Move the fastest swimmer to the end (4th position)
-        print("\nBest freestyle relay combination:")
-        for swimmer, time in free_times[:4]:  # Take the top 4 swimmers
-            print(f"FREE: {swimmer}, time {timeToDuration(time)}")
-        print(f"\nTotal relay time: {timeToDuration(sum(i[1] for i in free_times[:4]))}")
+    print_relays(times, relays, relay_type, single=relay_count == 1)
+    
+    if len(relays) < relay_count:
+        print(f"\nOnly {len(relays)} of {relay_count} relays could be filled with the selected swimmers.")
+    if len(relays) > 1:
+        print(f"Combined time of all relays: {format_duration(sum(relay[1] for relay in relays))}")
+    return relays
+
+class MinCostFlow:
+    # Successive shortest paths with Dijkstra on reduced costs. Edge costs must be non-negative.
+    # Each augmentation takes the cheapest path left, so after k units the flow is the cheapest
+    # flow of size k, and running to exhaustion gives the cheapest maximum flow.
+    def __init__(self, nodes):
+        self.graph = [[] for _ in range(nodes)]  # node -> [[to, capacity, cost, index of reverse edge]]
+        self.paths = []  # (units, cost per unit) of each augmentation, cheapest first
+
+    def add_edge(self, u, v, capacity, cost):
+        self.graph[u].append([v, capacity, cost, len(self.graph[v])])
+        self.graph[v].append([u, 0, -cost, len(self.graph[u]) - 1])
+        return self.graph[u][-1]
+
+    def solve(self, source, sink):
+        # Returns (flow, cost). Edge capacities are left as the residual capacities.
+        graph = self.graph
+        potential = [0] * len(graph)
+        flow = cost = 0
+        while True:
+            dist = [None] * len(graph)
+            parent = [None] * len(graph)
+            dist[source] = 0
+            heap = [(0, source)]
+            while heap:
+                d, u = heapq.heappop(heap)
+                if d > dist[u]:
+                    continue
+                for edge in graph[u]:
+                    v, capacity, edge_cost, _ = edge
+                    if capacity > 0:
+                        nd = d + edge_cost + potential[u] - potential[v]
+                        if dist[v] is None or nd < dist[v]:
+                            dist[v] = nd
+                            parent[v] = (u, edge)
+                            heapq.heappush(heap, (nd, v))
+            if dist[sink] is None:
+                return flow, cost
+            for v, d in enumerate(dist):
+                if d is not None:
+                    potential[v] += d
+
+            push = None
+            v = sink
+            while v != source:
+                u, edge = parent[v]
+                push = edge[1] if push is None else min(push, edge[1])
+                v = u
+            v = sink
+            while v != source:
+                u, edge = parent[v]
+                edge[1] -= push
+                graph[v][edge[3]][1] += push
+                cost += push * edge[2]
+                v = u
+            self.paths.append((push, potential[sink] - potential[source]))
+            flow += push
+
+    def cost_of(self, units):
+        # Cost of the cheapest flow of 'units' units; the paths were found cheapest first
+        cost = 0
+        for push, unit_cost in self.paths:
+            take = min(push, units)
+            cost += take * unit_cost
+            units -= take
+            if units <= 0:
+                break
+        return cost
+
+def sheet_divisions(splits):
+    # Divisions on the sheet, numbered divisions first: 1B, 1G, ..., 8G, O1B, ...
+    return sorted(div for div in splits.divisions if div)
+
+def meet_events(splits, relays_per_event=1):
+    # The default meet: a medley and a freestyle relay event for every division on the sheet
+    return [{"name": div, "divisions": [div], "type": relay_type, "count": relays_per_event}
+            for div in sheet_divisions(splits) for relay_type in ("medley", "freestyle")]
+
+def plan_meet_relays(splits, events, max_relays_per_swimmer=2):
+    # Fills every relay of a meet at once. 'events' is a list of
+    # {"name", "divisions", "type": "medley" | "freestyle", "count"}.
+    # A swimmer swims at most one leg per event and at most max_relays_per_swimmer relays
+    # overall; splits and leg eligibility come from get_swimtimes_bydiv, so restricted
+    # swimmers only appear on back and breast with converted 100s.
+    #
+    # Solved as one min-cost flow: source -> swimmer (capacity: the relay limit) ->
+    # swimmer in event (capacity 1) -> event leg (cost: the split) -> sink (capacity:
+    # relays in the event, four times that for freestyle). The flow fills as many legs
+    # as it can, as fast as it can, and is solved again while deciding which relays to give up.
+    #
+    # Returns [(event, times, relays)] in event order, where times holds the event's
+    # swimmers as (name, [centiseconds or None]) and relays is shaped like the output of
+    # find_disjoint_medleys or find_disjoint_free_relays (fastest relay first).
+    table = splits if isinstance(splits, SplitTable) else SplitTable(splits)
+    event_times = [split_centiseconds(get_swimtimes_bydiv(event["divisions"], table)) for event in events]
+    counts = []
+    for event, times in zip(events, event_times):
+        # No more relays than the swimmers can fill, leg by leg
+        legs = range(4) if event["type"] == "medley" else [3]
+        per_leg = min(sum(entry[1][leg] is not None for entry in times) for leg in legs)
+        counts.append(max(0, min(event["count"], len(times) // 4, per_leg // (1 if event["type"] == "medley" else 4))))
+
+    # Events that share no swimmers, directly or through other events, cannot affect each
+    # other, so each group of linked events is planned on its own.
+    group_of = list(range(len(events)))
+    def find(k):
+        while group_of[k] != k:
+            group_of[k] = group_of[group_of[k]]
+            k = group_of[k]
+        return k
+    first_event = {}
+    for k, times in enumerate(event_times):
+        for name, _ in times:
+            group_of[find(k)] = find(first_event.setdefault(name, k))
+    groups = {}
+    for k in range(len(events)):
+        groups.setdefault(find(k), []).append(k)
+
+    legs = [[[] for _ in range(4)] for _ in events]
+    for group in groups.values():
+        group_counts, group_legs = search_meet([events[k] for k in group], [event_times[k] for k in group],
+                                               [counts[k] for k in group], max_relays_per_swimmer)
+        for k, count, chosen in zip(group, group_counts, group_legs):
+            counts[k], legs[k] = count, chosen
+
+    plan = []
+    for event, times, count, chosen in zip(events, event_times, counts, legs):
+        if event["type"] == "medley":
+            # Relays of one event are interchangeable, so the fastest swimmer on each leg goes to A.
+            by_leg = [sorted(chosen[leg], key=lambda i: times[i][1][leg]) for leg in range(4)]
+            relays = []
+            for k in range(count):
+                best_choice = tuple((by_leg[leg][k], times[by_leg[leg][k]][1][leg]) for leg in range(4))
+                relays.append((best_choice, sum(value for _, value in best_choice)))
+        else:
+            relays = find_disjoint_free_relays([times[i] for i in chosen[3]], count)
+        plan.append((event, times, relays))
+    return plan
+
+def search_meet(events, event_times, counts, max_relays_per_swimmer):
+    # Relays left partly filled are worth nothing, so when the flow leaves some short, search
+    # over which relays to give up, one at a time and depth first, keeping the way that fills
+    # the most relays in the least combined time. Giving up a relay of a short event is
+    # tried first, but any event's relay may be the one to go. The cheapest flow of a given
+    # size in a meet is a lower bound on the time of any smaller meet it contains, which
+    # cuts branches that cannot beat the best plan found so far. Choosing which relays to give
+    # up is a hard problem in general, so after meet_search_limit solves the best plan so far
+    # is kept; the first plan reached is the one dropping relays from short events only.
+    # Returns the counts and chosen legs of the best plan.
+    best = None  # (relays, time, counts, legs)
+    seen = set()
+
+    def search(counts):
+        nonlocal best
+        if best is not None and len(seen) >= meet_search_limit:
+            return
+        seen.add(tuple(counts))
+        relays = sum(counts)
+        legs, flow_cost = solve_meet_flow(events, event_times, counts, max_relays_per_swimmer)
+        short = [k for k, event in enumerate(events) if counts[k] and complete_relays(event, legs[k]) < counts[k]]
+        if not short:
+            time = leg_time(event_times, legs)
+            if best is None or (relays, -time) > (best[0], -best[1]):
+                best = (relays, time, counts, legs)
+            return
+
+        # No smaller meet fills more legs than this one did
+        most = min(relays - 1, sum(len(chosen) for event_legs in legs for chosen in event_legs) // 4)
+        others = [k for k in range(len(events)) if counts[k] and k not in short]
+        for k in sorted(short, reverse=True) + others:
+            if best is not None and (most < best[0] or most == best[0] and flow_cost(4 * best[0]) >= best[1]):
+                return
+            smaller = counts[:k] + [counts[k] - 1] + counts[k + 1:]
+            if tuple(smaller) not in seen:
+                search(smaller)
+
+    search(counts)
+    return best[2], best[3]
+
+def leg_time(event_times, legs):
+    return sum(event_times[k][i][1][leg] for k, chosen in enumerate(legs) for leg in range(4) for i in chosen[leg])
+
+def complete_relays(event, legs):
+    # How many full relays the legs chosen for an event make up
+    if event["type"] == "medley":
+        return min(len(swimmers) for swimmers in legs)
+    return len(legs[3]) // 4
+
+def solve_meet_flow(events, event_times, counts, max_relays_per_swimmer):
+    # Returns, per event, the indices into its times chosen for each leg (FL, BK, BR, FR),
+    # and the flow's cost_of for bounding the search in search_meet.
+    names = {}
+    for times in event_times:
+        for entry in times:
+            names.setdefault(entry[0], len(names))
+    swimmer_nodes = 2  # 0 is the source, 1 the sink
+    next_node = swimmer_nodes + len(names)
+    legs_at = []  # event -> {leg: node}
+    edges = []  # (event, index into its times, leg, edge)
+    for k, (event, times) in enumerate(zip(events, event_times)):
+        if not counts[k]:
+            legs_at.append({})
+            continue
+        medley = event["type"] == "medley"
+        legs_at.append({leg: next_node + j for j, leg in enumerate(range(4) if medley else [3])})
+        next_node += len(legs_at[k])
+    # Only the fastest few swimmers on a leg can ever swim it. If a slower one did, each
+    # faster one would have to be on another leg of the event or out of relays to swim, or
+    # swapping them in would be faster. So a leg keeps as many candidates as the event has
+    # legs, plus the most swimmers the other events sharing its swimmers could use up.
+    event_names = [{name for name, _ in times} for times in event_times]
+    keep = []  # event -> {leg: indices into its times}
+    for k, times in enumerate(event_times):
+        if not legs_at[k]:
+            keep.append({})
+            continue
+        elsewhere = sum(4 * counts[j] for j in range(len(events))
+                        if j != k and counts[j] and not event_names[k].isdisjoint(event_names[j]))
+        limit = 4 * counts[k] + elsewhere // max_relays_per_swimmer
+        keep.append({leg: set(sorted((i for i, entry in enumerate(times) if entry[1][leg] is not None),
+                                     key=lambda i: times[i][1][leg])[:limit]) for leg in legs_at[k]})
+    flow = MinCostFlow(next_node + sum(len(times) for times in event_times))
+
+    for name, node in names.items():
+        flow.add_edge(0, swimmer_nodes + node, max_relays_per_swimmer, 0)
+    for k, event in enumerate(events):
+        for leg, node in legs_at[k].items():
+            flow.add_edge(node, 1, counts[k] * (1 if event["type"] == "medley" else 4), 0)
+    for k, times in enumerate(event_times):
+        if not legs_at[k]:
+            continue
+        for i, (name, values) in enumerate(times):
+            usable = [(leg, values[leg]) for leg in legs_at[k] if i in keep[k][leg]]
+            if not usable:
+                continue
+            entry_node = next_node
+            next_node += 1
+            flow.add_edge(swimmer_nodes + names[name], entry_node, 1, 0)
+            for leg, value in usable:
+                edges.append((k, i, leg, flow.add_edge(entry_node, legs_at[k][leg], 1, value)))
+    flow.solve(0, 1)
+
+    chosen = [[[] for _ in range(4)] for _ in events]
+    for k, i, leg, edge in edges:
+        if edge[1] == 0:
+            chosen[k][leg].append(i)
+    return chosen, flow.cost_of
+
+def print_meet_plan(plan, max_relays_per_swimmer):
+    total = 0
+    relays_by_name = {}
+    for event, times, relays in plan:
+        if not relays:
+            print(f"\n{event['name']} {event['type']}: no relay could be filled.")
+            continue
+        print_relays(times, relays, event["type"], prefix=f"{event['name']} ")
+        total += sum(relay[1] for relay in relays)
+        for relay, _ in relays:
+            for name in (times[i][0] for i, _ in relay) if event["type"] == "medley" else (name for name, _ in relay):
+                relays_by_name[name] = relays_by_name.get(name, 0) + 1
+    filled = sum(len(relays) for _, _, relays in plan)
+    wanted = sum(event["count"] for event, _, _ in plan)
+    print(f"\nFilled {filled} of {wanted} relays with {len(relays_by_name)} swimmers "
+          f"(at most {max_relays_per_swimmer} relays each). Combined time: {format_duration(total)}")
+
+def choose_meet_limits():
+    limit = input("Most relays any one swimmer can swim? Leave blank for 2: ").strip()
+    count = input("Relays per event (A, B, C...)? Leave blank for 1: ").strip()
+    try:
+        limit = int(limit) if limit else 2
+        count = int(count) if count else 1
+    except ValueError:
+        print("Invalid number, using 2 relays per swimmer and 1 relay per event.")
+        return 2, 1
+    return max(1, limit), max(1, min(count, len(relay_labels)))
+
+def choose_relay_count():
+    count = input("How many relays to make (A, B, C...)? Leave blank for 1: ").strip()
+    if not count:
+        return 1, "combined"
+    try:
+        count = int(count)
+    except ValueError:
+        print("Invalid number, making 1 relay.")
+        return 1, "combined"
+    count = max(1, min(count, len(relay_labels)))
+    if count == 1:
+        return 1, "combined"
+    
+    objective = input("Optimize for (1) fastest combined time or (2) fastest A relay first? Leave blank for 1: ").strip()
+    return count, "lexicographic" if objective == "2" else "combined"
 
 def get_type_of_relay(mode):
     if mode in [3]:
@@ -388,7 +926,7 @@ def calc_medley_time(times):
         raise ValueError("Invalid input: times must be a list of 4 tuples (swimmer, [times])")
     
     for i in range(len(times)):
-        times[i] = (times[i][0], [durationToTime(t) if t else None for t in times[i][1]])
+        times[i] = (times[i][0], [parse_duration(t) if t else None for t in times[i][1]])
     
     times_needed = [
         (times[0][0], times[0][1][1]),  # Backstroke
@@ -401,7 +939,7 @@ def calc_medley_time(times):
     for i in range(len(times_needed)):
         swimmer, time = times_needed[i]
         if time is not None:
-            print(f"{strokes[i]}: {swimmer}, time {timeToDuration(time)}")
+            print(f"{strokes[i]}: {swimmer}, time {format_duration(time)}")
         else:
             print(f"{strokes[i]}: {swimmer} does not have a valid time.")
             return None
@@ -413,14 +951,14 @@ def calc_freestyle_time(times):
         raise ValueError("Invalid input: times must be a list of 4 tuples (swimmer, [times])")
     
     for i in range(len(times)):
-        times[i] = (times[i][0], [durationToTime(t) if t else None for t in times[i][1]])
+        times[i] = (times[i][0], [parse_duration(t) if t else None for t in times[i][1]])
     
     freestyle_times = [(times[i][0], times[i][1][3]) for i in range(4)]
     
     print("\nFreestyle Relay Swimmers and their times:")
     for swimmer, time in freestyle_times:
         if time is not None:
-            print(f"FREE: {swimmer}, time {timeToDuration(time)}")
+            print(f"FREE: {swimmer}, time {format_duration(time)}")
         else:
             print(f"{swimmer} does not have a valid time.")
             return None
@@ -432,11 +970,11 @@ def relay_time(times, mode):
         case "medley":
             time = calc_medley_time(times)
             if time is not None:
-                print(f"\nEstimated Medley Relay time: {timeToDuration(time)}")
+                print(f"\nEstimated Medley Relay time: {format_duration(time)}")
         case "freestyle":
             time = calc_freestyle_time(times)
             if time is not None:
-                print(f"\nEstimated Freestyle Relay time: {timeToDuration(time)}")
+                print(f"\nEstimated Freestyle Relay time: {format_duration(time)}")
         case 0:
             print("Invalid relay type selected. Please try again.")
         case None:
@@ -453,6 +991,11 @@ def medley_main():
         print("No times found in the best time sheet.")
         return
     
+    from split_model import load_split_model
+    
+    name_index = NameIndex(csvdata)
+    splits = SplitTable(csvdata, load_split_model(csvdata))
+    
     print("Welcome to the Relay Maker!")
     while True:
         
@@ -463,20 +1006,28 @@ def medley_main():
                 print("Invalid mode selected. Please try again.")
                 continue
             case 1:
-                names = choose_names(csvdata, input_mode)
+                names = choose_names(name_index, input_mode)
                 if not names:
                     continue
-                times = get_swimtimes_byname(names, csvdata)
+                times = get_swimtimes_byname(names, splits)
             case 2:
                 divs = choose_divisions()
                 if not divs:
                     continue
-                times = get_swimtimes_bydiv(divs, csvdata)
+                times = get_swimtimes_bydiv(divs, splits)
             case 3:
-                names = choose_names(csvdata, input_mode, min_names=4, max_names=4)
+                names = choose_names(name_index, input_mode, min_names=4, max_names=4)
                 if not names:
                     continue
-                times = get_swimtimes_byname(names, csvdata)
+                times = get_swimtimes_byname(names, splits)
+            case 4:
+                max_relays, relays_per_event = choose_meet_limits()
+                st = time()
+                plan = plan_meet_relays(splits, meet_events(splits, relays_per_event), max_relays)
+                nd = time()
+                print_meet_plan(plan, max_relays)
+                print(f"\nTook {(nd - st) / 1_000_000} ms to determine.")
+                return
             case None:
                 print("Exiting the Relay Maker.")
                 return 1
@@ -494,11 +1045,13 @@ def medley_main():
             # print(f"{swimmer}: {'\t'.join([t for t in swimmer_times if t is not None else 'None'])}")
         
         relay_type = get_type_of_relay(input_mode)
+        if input_mode in [1, 2]:
+            relay_count, objective = choose_relay_count()
         
         st = time()
         match input_mode:
             case 1 | 2:
-                find_best_combo(times, relay_type)
+                find_best_combo(times, relay_type, relay_count, objective)
             case 3:
                 if not(relay_time(times, relay_type)):
                     continue
@@ -0,0 +1,104 @@
+"""Per-run ingestion metrics, kept as a JSON run record and optionally as Prometheus text.
+
+Counters are kept per event label. Downloads and decoding count against the result
+file ('M50FR'); merging counts against the sheet column ('50FR'), which both genders
+share. Everything is safe to update from the download worker threads.
+"""
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from time import monotonic, perf_counter_ns
+
+class RunMetrics:
+    def __init__(self, command: str = ""):
+        self.command = command
+        self.started = datetime.now(timezone.utc)
+        self.startedClock = monotonic()
+        self.lock = threading.Lock()
+        self.events = {}  # label -> {counter: value}
+        self.stages = {}  # stage -> wall ms
+
+    def count(self, event: str, key: str, amount=1):
+        with self.lock:
+            counters = self.events.setdefault(event, {})
+            counters[key] = counters.get(key, 0) + amount
+
+    @contextmanager
+    def timer(self, event: str, key: str):
+        """Adds the time spent in the block to an event counter, in ms."""
+        st = perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.count(event, key, round((perf_counter_ns() - st) / 1_000_000, 3))
+
+    @contextmanager
+    def stage(self, name: str):
+        """Records the wall time of a whole pipeline stage, in ms."""
+        st = perf_counter_ns()
+        try:
+            yield
+        finally:
+            elapsed = round((perf_counter_ns() - st) / 1_000_000, 3)
+            with self.lock:
+                self.stages[name] = self.stages.get(name, 0) + elapsed
+
+    def totals(self):
+        totals = {}
+        with self.lock:
+            for counters in self.events.values():
+                for key, value in counters.items():
+                    totals[key] = totals.get(key, 0) + value
+        return {key: round(value, 3) if isinstance(value, float) else value for key, value in totals.items()}
+
+    def record(self, **extra):
+        """The run as one JSON-ready dict. `extra` adds fields such as the run outcome."""
+        with self.lock:
+            events = {label: dict(counters) for label, counters in sorted(self.events.items())}
+            stages = dict(self.stages)
+        return {
+            "started": self.started.isoformat(timespec="seconds"),
+            "command": self.command,
+            "wall_ms": round((monotonic() - self.startedClock) * 1000, 3),
+            **extra,
+            "stages": stages,
+            "totals": self.totals(),
+            "events": events,
+        }
+
+    def write_json(self, path: str, record: dict):
+        """Appends the run record as one line, so the file keeps the history of every run."""
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, sort_keys=True) + "\n")
+
+    def write_prometheus(self, path: str, record: dict, prefix: str = "best_time_tracker"):
+        """Writes the run in Prometheus text format, e.g. for node_exporter's textfile collector."""
+        lines = [
+            f"# TYPE {prefix}_run_timestamp_seconds gauge",
+            f"{prefix}_run_timestamp_seconds {self.started.timestamp():.0f}",
+            f"# TYPE {prefix}_run_wall_seconds gauge",
+            f"{prefix}_run_wall_seconds {record['wall_ms'] / 1000:.3f}",
+        ]
+        if "ok" in record:
+            lines += [f"# TYPE {prefix}_run_ok gauge", f"{prefix}_run_ok {int(bool(record['ok']))}"]
+
+        lines.append(f"# TYPE {prefix}_stage_seconds gauge")
+        for stage, ms in sorted(record["stages"].items()):
+            lines.append(f'{prefix}_stage_seconds{{stage="{stage}"}} {ms / 1000:.3f}')
+
+        keys = sorted({key for counters in record["events"].values() for key in counters})
+        for key in keys:
+            # Millisecond counters are exported in seconds, following Prometheus naming conventions.
+            name = f"{prefix}_{key[:-3]}_seconds" if key.endswith("_ms") else f"{prefix}_{key}"
+            lines.append(f"# TYPE {name} gauge")
+            for label, counters in record["events"].items():
+                if key in counters:
+                    value = counters[key] / 1000 if key.endswith("_ms") else counters[key]
+                    lines.append(f'{name}{{event="{label}"}} {value}')
+
+        temp_name = path + ".tmp"
+        with open(temp_name, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temp_name, path)
@@ -0,0 +1,185 @@
+"""Fitted 100 -> 50 split conversion for relays.
+
+Relay legs are 50s, so a swimmer with only a 100 time gets an estimated split from a
+power law, 50 = a * 100^b (in seconds). Here a and b are fitted per stroke, and
+optionally per stroke and division, by least squares on log(50) against log(100),
+using every swimmer on the sheet who has both times. Groups with too few pairs fall
+back to their stroke, and strokes to the hard-coded law in relay_tools.
+
+Fits are cached in a JSON file keyed by a hash of the times they came from, so a
+sheet that has not changed never gets refitted.
+"""
+import hashlib
+import json
+import math
+import os
+import sys
+
+from relay_tools import best_time_file, default_split_coefficients, hundred_to_fifty, read_times, relay_events
+from time_codec import load_numpy, parse_column
+
+model_file = "split_model.json"
+fit_per_division = False  # Also fit each division separately where it has enough pairs
+fit_min_pairs = 8  # Fewer pairs than this and a group uses its stroke's (or the default) coefficients
+
+class SplitModel:
+    def __init__(self, coefficients: dict):
+        # "FL" or "FL/3B" -> {"a", "b", "pairs"}
+        self.fitted = coefficients
+        self.table = {key: (fit["a"], fit["b"]) for key, fit in coefficients.items()}
+
+    def coefficients(self, stroke: str, division: str | None = None):
+        """(a, b) for a stroke, using the division's own fit when there is one."""
+        if division:
+            fit = self.table.get(f"{stroke}/{division}")
+            if fit:
+                return fit
+        return self.table.get(stroke, default_split_coefficients)
+
+    def fifty(self, hundred_time: str, stroke: str, division: str | None = None):
+        return hundred_to_fifty(hundred_time, self.coefficients(stroke, division))
+
+def sheet_columns(csvtimes):
+    header = csvtimes[0] if csvtimes and csvtimes[0] and csvtimes[0][0] == 'Name' else None
+    columns = {event: i for i, event in enumerate(header or [])}
+    rows = [row for row in (csvtimes[1:] if header else csvtimes) if row and row[0]]
+    return columns, rows
+
+def data_key(csvtimes, per_division=fit_per_division, min_pairs=fit_min_pairs):
+    """Hash of everything a fit depends on: the settings, divisions and the 50 and 100 columns."""
+    columns, rows = sheet_columns(csvtimes)
+    digest = hashlib.sha256(f"{per_division}|{min_pairs}|{default_split_coefficients}".encode())
+    wanted = [columns.get(event) for pair in relay_events.values() for event in pair]
+    for row in rows:
+        cells = [row[1] if len(row) > 1 else ''] + [row[i] if i is not None and i < len(row) else '' for i in wanted]
+        digest.update(("\x1f".join(cells) + "\x1e").encode())
+    return digest.hexdigest()
+
+def paired_times(csvtimes, stroke):
+    """(divisions, 50 centiseconds, 100 centiseconds) for swimmers with both times in a stroke."""
+    columns, rows = sheet_columns(csvtimes)
+    fifty, hundred = (columns.get(event) for event in relay_events[stroke])
+    if fifty is None or hundred is None:
+        return [], [], []
+    fifties = parse_column(row[fifty] if fifty < len(row) else '' for row in rows)
+    hundreds = parse_column(row[hundred] if hundred < len(row) else '' for row in rows)
+    if hasattr(fifties, "dtype"):  # Long columns come back as NumPy arrays
+        keep = ((fifties > 0) & (fifties < hundreds)).nonzero()[0].tolist()
+    else:
+        keep = [i for i in range(len(rows)) if 0 < fifties[i] < hundreds[i]]  # MISSING is negative
+    return [rows[i][1] if len(rows[i]) > 1 else '' for i in keep], [int(fifties[i]) for i in keep], [int(hundreds[i]) for i in keep]
+
+def log_sums(groups, fifties, hundreds):
+    """Per-group n, sum x, sum y, sum x^2 and sum xy of x = log(100), y = log(50) in seconds.
+
+    Uses NumPy (logs and bincount over the whole batch) when it is installed.
+    """
+    numpy = load_numpy() if fifties else None
+    if numpy:
+        labels = sorted(set(groups))
+        index = {label: i for i, label in enumerate(labels)}
+        ids = numpy.array([index[g] for g in groups])
+        x = numpy.log(numpy.array(hundreds) / 100)
+        y = numpy.log(numpy.array(fifties) / 100)
+        sums = [numpy.bincount(ids, weights=w, minlength=len(labels)) for w in (None, x, y, x * x, x * y)]
+        return {label: tuple(float(s[i]) for s in sums) for label, i in index.items()}
+
+    sums = {}
+    for g, fifty, hundred in zip(groups, fifties, hundreds):
+        x, y = math.log(hundred / 100), math.log(fifty / 100)
+        n, sx, sy, sxx, sxy = sums.get(g, (0, 0.0, 0.0, 0.0, 0.0))
+        sums[g] = (n + 1, sx + x, sy + y, sxx + x * x, sxy + x * y)
+    return sums
+
+def solve(n, sx, sy, sxx, sxy):
+    """Least-squares line through the sums. Returns (a, b) of the power law, or None."""
+    spread = n * sxx - sx * sx
+    if n < 2 or spread <= 1e-12 * max(1.0, n * sxx):
+        return None
+    b = (n * sxy - sx * sy) / spread
+    return math.exp((sy - b * sx) / n), b
+
+def fit(csvtimes, per_division=fit_per_division, min_pairs=fit_min_pairs):
+    """Fits the coefficients for every stroke (and division). Returns {key: {"a", "b", "pairs"}}."""
+    coefficients = {}
+    for stroke in relay_events:
+        divisions, fifties, hundreds = paired_times(csvtimes, stroke)
+        groups = [stroke] * len(fifties)
+        if per_division:
+            groups += [f"{stroke}/{division}" for division in divisions]
+            fifties, hundreds = fifties + fifties, hundreds + hundreds
+        for key, sums in log_sums(groups, fifties, hundreds).items():
+            solved = solve(*sums) if sums[0] >= min_pairs else None
+            if solved:
+                coefficients[key] = {"a": round(solved[0], 6), "b": round(solved[1], 6), "pairs": int(sums[0])}
+    return coefficients
+
+def load_split_model(csvtimes, path=None, per_division=None, min_pairs=None):
+    """The model for a sheet: from the cache when the data is unchanged, otherwise refitted and cached.
+
+    Settings left as None come from the module settings; path="" skips the cache file.
+    """
+    path = model_file if path is None else path
+    per_division = fit_per_division if per_division is None else per_division
+    min_pairs = fit_min_pairs if min_pairs is None else min_pairs
+    key = data_key(csvtimes, per_division, min_pairs)
+    if path and os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get("key") == key:
+                return SplitModel(cached["coefficients"])
+        except (OSError, ValueError, KeyError):
+            pass  # Refit below
+
+    model = SplitModel(fit(csvtimes, per_division, min_pairs))
+    if path:
+        temp_name = path + ".tmp"
+        with open(temp_name, 'w', encoding='utf-8') as f:
+            json.dump({"key": key, "coefficients": model.fitted}, f, indent=1, sort_keys=True)
+        os.replace(temp_name, path)
+    return model
+
+def mean_error(csvtimes, stroke, model=None):
+    """Mean absolute error in seconds of the converted 100s against the real 50s in a stroke.
+
+    Without a model, measures the default law.
+    """
+    divisions, fifties, hundreds = paired_times(csvtimes, stroke)
+    if not fifties:
+        return None
+    error = 0.0
+    for division, fifty, hundred in zip(divisions, fifties, hundreds):
+        a, b = model.coefficients(stroke, division) if model else default_split_coefficients
+        error += abs(a * (hundred / 100) ** b - fifty / 100)
+    return round(error / len(fifties), 3)
+
+def describe(csvtimes, model):
+    """Per-stroke fits next to the hard-coded law, as rows for printing or a JSON summary."""
+    rows = []
+    for stroke in relay_events:
+        fitted = model.fitted.get(stroke)
+        rows.append({
+            "stroke": stroke,
+            "a": fitted["a"] if fitted else None,
+            "b": fitted["b"] if fitted else None,
+            "pairs": fitted["pairs"] if fitted else 0,
+            "divisions": sorted(key.split("/")[1] for key in model.fitted if key.startswith(f"{stroke}/")),
+            "error_s": mean_error(csvtimes, stroke, model),
+            "default_error_s": mean_error(csvtimes, stroke),
+        })
+    return rows
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    split_by_division = "--per-division" in args
+    args = [arg for arg in args if arg != "--per-division"]
+    csvtimes = read_times(args[0] if args else best_time_file)
+    model = load_split_model(csvtimes, per_division=split_by_division)
+    for row in describe(csvtimes, model):
+        if row["a"] is None:
+            print(f"{row['stroke']}: not enough swimmers with both a 50 and a 100 ({fit_min_pairs} needed); using the default")
+            continue
+        divisions = f", {len(row['divisions'])} division fit(s)" if row["divisions"] else ""
+        print(f"{row['stroke']}: 50 = {row['a']:.4f} * 100^{row['b']:.4f} from {row['pairs']} swimmers{divisions}; "
+              f"mean error {row['error_s']:.2f} s (default {row['default_error_s']:.2f} s)")
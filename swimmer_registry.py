@@ -0,0 +1,133 @@
+"""Stable swimmer IDs, and the names results pages use for them.
+
+Every swimmer who has been on the roster keeps the ID they were first given, through
+division changes and respellings of their name. Results names are matched exactly,
+then by a normalized form that ignores case, accents, punctuation and spacing, then
+through an alias table learned from earlier resolutions, including names marked as
+not ours. Each step is one dict lookup. Names left unanswered are remembered with the
+candidates they were shown, so they are only asked about again once those change. The
+registry is saved as JSON.
+"""
+import json
+import os
+import re
+import unicodedata
+
+IGNORED = 0  # resolve() result for names learned to skip; swimmer IDs start at 1
+
+def normalize_name(name: str) -> str:
+    """'José  O'Brien-Li' -> 'jose obrien li'."""
+    decomposed = unicodedata.normalize("NFKD", name.casefold())
+    name = "".join(c for c in decomposed if not unicodedata.combining(c))
+    name = re.sub(r"[^\w\s-]", "", name)
+    return " ".join(name.replace("-", " ").split())
+
+class SwimmerRegistry:
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self.swimmers = {}  # id -> {"name", "division", "active"}
+        self.by_name = {}  # exact name -> id
+        self.by_key = {}  # normalized name -> id, or None when two swimmers share it
+        self.aliases = {}  # normalized results name -> id, or IGNORED
+        self.dismissed = {}  # normalized results name -> sorted candidate names it was left unanswered with
+        self.next_id = 1
+        self.dirty = False
+        if path and os.path.exists(path):
+            self.load()
+
+    def load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.next_id = data["next_id"]
+        self.swimmers = {int(sid): swimmer for sid, swimmer in data["swimmers"].items()}
+        self.aliases = {key: IGNORED if sid is None else sid for key, sid in data["aliases"].items()}
+        self.dismissed = data.get("dismissed", {})
+        self.reindex()
+
+    def save(self):
+        if not self.path or not self.dirty:
+            return
+        data = {
+            "next_id": self.next_id,
+            "swimmers": {str(sid): swimmer for sid, swimmer in sorted(self.swimmers.items())},
+            "aliases": {key: None if sid == IGNORED else sid for key, sid in sorted(self.aliases.items())},
+            "dismissed": dict(sorted(self.dismissed.items())),
+        }
+        temp_name = self.path + ".tmp"
+        with open(temp_name, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1)
+        os.replace(temp_name, self.path)
+        self.dirty = False
+
+    def reindex(self):
+        self.by_name = {}
+        self.by_key = {}
+        # Active swimmers first, so a current swimmer wins over a retired one with the same name.
+        for sid, swimmer in sorted(self.swimmers.items(), key=lambda item: not item[1]["active"]):
+            self.by_name.setdefault(swimmer["name"], sid)
+            key = normalize_name(swimmer["name"])
+            if key not in self.by_key:
+                self.by_key[key] = sid
+            elif self.by_key[key] is not None and self.swimmers[self.by_key[key]]["active"] == swimmer["active"]:
+                self.by_key[key] = None
+
+    def sync(self, roster: list[list[str]]):
+        """Registers [name, division] rows, giving new swimmers IDs. Swimmers not on the roster are kept as inactive."""
+        names = {name for name, _ in roster}
+        active = set()
+        for name, division in roster:
+            sid = self.by_name.get(name)
+            if sid is None:
+                # A respelling (case, accents, punctuation) of a name that left the roster keeps its ID.
+                sid = self.by_key.get(normalize_name(name))
+                if sid is None or sid in active or self.swimmers[sid]["name"] in names:
+                    sid = self.next_id
+                    self.next_id += 1
+            swimmer = {"name": name, "division": division, "active": True}
+            if self.swimmers.get(sid) != swimmer:
+                self.swimmers[sid] = swimmer
+                self.dirty = True
+            active.add(sid)
+
+        for sid, swimmer in self.swimmers.items():
+            if swimmer["active"] and sid not in active:
+                swimmer["active"] = False
+                self.dirty = True
+        self.reindex()
+
+    def resolve(self, name: str):
+        """The swimmer ID for a results name, IGNORED for names learned to skip, or None if unknown."""
+        sid = self.by_name.get(name)
+        if sid is not None:
+            return sid
+        key = normalize_name(name)
+        sid = self.by_key.get(key)
+        if sid is not None:
+            return sid
+        return self.aliases.get(key)
+
+    def name_of(self, sid: int):
+        return self.swimmers[sid]["name"]
+
+    def is_active(self, sid: int):
+        return sid != IGNORED and self.swimmers[sid]["active"]
+
+    def learn(self, name: str, sid: int):
+        """Remembers that a results name refers to a swimmer."""
+        key = normalize_name(name)
+        self.aliases[key] = sid
+        self.dismissed.pop(key, None)
+        self.dirty = True
+
+    def ignore(self, name: str):
+        """Remembers that a results name is not one of our swimmers."""
+        self.learn(name, IGNORED)
+
+    def dismiss(self, name: str, candidates: list[str]):
+        """Remembers that a results name was left unanswered when shown these candidates."""
+        self.dismissed[normalize_name(name)] = sorted(candidates)
+        self.dirty = True
+
+    def is_dismissed(self, name: str, candidates: list[str]):
+        """Whether a results name was already left unanswered with the same candidates."""
+        return self.dismissed.get(normalize_name(name)) == sorted(candidates)
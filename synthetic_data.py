@@ -0,0 +1,150 @@
+"""Synthetic rosters, best-time sheets and event result pages for benchmarks.
+
+Everything is generated from a seed, so a run at a given size always produces the same
+data. Result lines follow the shape of the text readPDFFile and readHTMLResults
+pick apart, e.g. 'Male 50 Free Times' followed by '1 Shen, Adam 12 29.87': the
+header and the rest go through extractTimes unchanged.
+"""
+import os
+import random
+import sys
+
+from time_codec import format_duration, normalize_duration
+
+syllables = ["an", "be", "chi", "da", "el", "fi", "go", "ha", "in", "jo", "ka", "li", "ma", "no", "or",
+             "pa", "qui", "ra", "si", "ta", "un", "vi", "wen", "xi", "ya", "zo", "ng", "sh", "tr", "ee"]
+
+divisions = [f"{n}{g}" for n in range(1, 9) for g in "BG"] + ["O1B", "O1G", "O2B", "O2G"]
+
+# Event: (distance, stroke word on the results page, typical time in seconds for a mid division)
+events = {
+    "100IM": ("100", "IM", 80),
+    "200IM": ("200", "IM", 170),
+    "50FL": ("50", "Fly", 35),
+    "100FL": ("100", "Fly", 78),
+    "50BK": ("50", "Back", 38),
+    "100BK": ("100", "Back", 80),
+    "50BR": ("50", "Breast", 42),
+    "100BR": ("100", "Breast", 90),
+    "50FR": ("50", "Free", 31),
+    "100FR": ("100", "Free", 68),
+}
+sheet_header = ['Name', 'Div.'] + list(events)
+
+def make_names(count, rng):
+    """Returns `count` distinct 'First Last' names built from random syllables."""
+    word = lambda parts: "".join(rng.choice(syllables) for _ in range(parts)).capitalize()
+    names = set()
+    while len(names) < count:
+        names.add(f"{word(rng.randint(2, 3))} {word(rng.randint(1, 3))}")
+    return sorted(names)
+
+def division_age(division):
+    # Division numbers rise with age; open divisions are the oldest swimmers.
+    return 9 + int(division[1]) if division[0] == "O" else 5 + int(division[0])
+
+def make_roster(swimmers, seed=1):
+    """Builds [name, division] rows shaped like swim_info.csv (without its header)."""
+    rng = random.Random(seed)
+    return [[name, rng.choice(divisions)] for name in make_names(swimmers, rng)]
+
+def make_time(event, division, rng):
+    """Returns a plausible time for the event as centiseconds."""
+    speed = 1.6 - 0.06 * division_age(division)
+    return round(events[event][2] * speed * rng.uniform(0.85, 1.15) * 100)
+
+def make_time_sheet(roster, seed=1, fill=0.5):
+    """Builds a master_times.csv sheet for the roster, with about `fill` of the cells set."""
+    rng = random.Random(seed)
+    rows = [list(sheet_header)]
+    for name, division in roster:
+        rows.append([name, division] + [
+            format_duration(make_time(event, division, rng)) if rng.random() < fill else ''
+            for event in events
+        ])
+    return rows
+
+def results_time(centiseconds):
+    # Results pages drop the hours and, under a minute, the minutes too: '1:02.34', '29.87'.
+    duration = format_duration(centiseconds)
+    return duration[3:].lstrip("0") if centiseconds >= 6000 else duration[6:]
+
+def make_result_lines(event, gender, roster, seed=1, entered=0.5, strangers=0.02):
+    """Builds one event's result lines for swimmers of one gender ('Male' or 'Female').
+
+    About `entered` of the matching roster swims the event; `strangers` adds names that
+    are not on the roster, so the rejection path gets exercised too.
+    """
+    rng = random.Random(f"{seed}-{gender}-{event}")
+    letter = "B" if gender == "Male" else "G"
+    swimmers = [s for s in roster if s[1][-1] == letter and rng.random() < entered]
+    swimmers += [[name, rng.choice(divisions[:-4])] for name in make_names(round(len(swimmers) * strangers), rng)]
+
+    results = sorted((make_time(event, division, rng), name, division) for name, division in swimmers)
+    distance, stroke, _ = events[event]
+    lines = [f"{gender} {distance} {stroke} Times"]
+    for place, (centiseconds, name, division) in enumerate(results, 1):
+        first, last = name.split(" ", 1)
+        lines.append(f"{place} {last}, {first} {division_age(division)} {results_time(centiseconds)}")
+    return lines
+
+def make_result_page(lines):
+    """Wraps result lines in an aTeamResults.asp-style HTML table."""
+    rows = [f"<tr><td colspan=\"4\"><b>{lines[0]}</b></td></tr>"]
+    for line in lines[1:]:
+        place, rest = line.split(" ", 1)
+        name, age, time = rest.rsplit(" ", 2)
+        rows.append(f"<tr><td>{place}</td><td>{name}</td><td>{age}</td><td>{time}</td></tr>")
+    return "<html><head><title>Team Results</title></head><body><table>\n" + "\n".join(rows) + "\n</table></body></html>\n"
+
+def result_file_name(event, gender):
+    # Matches the names getAllEvents gives downloaded files, e.g. M50FR.
+    return f"{gender[0]}{event}"
+
+def write_dataset(folder, swimmers, seed=1, pdf=False):
+    """Writes swim_info.csv, master_times.csv and one results page per event and gender to `folder`.
+
+    With pdf=True each page is also rendered to a PDF, which needs WeasyPrint.
+    """
+    import csv
+
+    os.makedirs(folder, exist_ok=True)
+    roster = make_roster(swimmers, seed)
+    with open(os.path.join(folder, "swim_info.csv"), 'w', newline='') as f:
+        csv.writer(f).writerows([["Swimmer Name", "Division"]] + roster)
+    with open(os.path.join(folder, "master_times.csv"), 'w', newline='') as f:
+        csv.writer(f).writerows(make_time_sheet(roster, seed))
+
+    results = os.path.join(folder, "grabbed_pdfs")
+    os.makedirs(results, exist_ok=True)
+    for gender in ["Male", "Female"]:
+        for event in events:
+            page = make_result_page(make_result_lines(event, gender, roster, seed))
+            name = result_file_name(event, gender)
+            with open(os.path.join(results, f"{name}.html"), 'w', encoding='utf-8') as f:
+                f.write(page)
+            if pdf:
+                from main import renderPdf
+                renderPdf(page, os.path.join(results, f"{name}.pdf"))
+    return roster
+
+def check_round_trip(roster, seed=1):
+    """Raises if the generated pages do not decode back to the times they were made from."""
+    from main import extractTimes, readHTMLResults
+
+    for gender in ["Male", "Female"]:
+        for event in events:
+            lines = make_result_lines(event, gender, roster, seed)
+            decoded_event, times = extractTimes(*readHTMLResults(make_result_page(lines)))
+            if decoded_event != event or len(times) != len(lines) - 1:
+                raise Exception(f"Synthetic {gender} {event} page decoded as {decoded_event} with {len(times)} times")
+            for (name, time), line in zip(times, lines[1:]):
+                if normalize_duration(time) != normalize_duration(line.rsplit(" ", 1)[1]):
+                    raise Exception(f"Synthetic {gender} {event} time for {name} decoded as {time}")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python synthetic_data.py FOLDER SWIMMERS [--pdf]")
+        sys.exit(1)
+    write_dataset(sys.argv[1], int(sys.argv[2]), pdf="--pdf" in sys.argv[3:])
+    print(f"Wrote {sys.argv[2]} synthetic swimmers to {sys.argv[1]}.")
@@ -0,0 +1,82 @@
+"""Shared swim time handling.
+
+Times are stored as integer centiseconds, so comparisons and sums are exact. On disk
+they are written as 'HH:MM:SS.hh' durations, the canonical format of master_times.csv.
+"""
+import re
+from array import array
+
+np = None  # NumPy is optional and imported on first use; the column helpers fall back to array('q')
+numpy_min_column = 1000  # Shorter columns are parsed in pure Python, which beats importing NumPy
+
+MISSING = -1  # Placeholder for empty cells in parsed columns
+ZERO_DURATION = "00:00:00.00"
+
+canonicalPattern = re.compile(r"\d\d:\d\d:\d\d\.\d\d")
+
+def is_canonical(duration: str) -> bool:
+    return canonicalPattern.fullmatch(duration) is not None
+
+def normalize_duration(raw: str) -> str:
+    """Formats loosely typed times ('14256', '1:42.56', '59.9') as 'HH:MM:SS.hh'.
+
+    Digits are placed from the right, so the last two are always hundredths.
+    """
+    if is_canonical(raw):
+        return raw
+    digits = "".join(c for c in raw if c.isdigit())[-8:].rjust(8, "0")
+    return f"{digits[0:2]}:{digits[2:4]}:{digits[4:6]}.{digits[6:8]}"
+
+def parse_duration(duration: str) -> int:
+    """Converts a canonical 'HH:MM:SS.hh' duration to centiseconds."""
+    if len(duration) != 11:
+        raise Exception(f"Attempted to convert duration to time, but failed: '{duration}' was not of proper length")
+    return (int(duration[0:2]) * 360000 + int(duration[3:5]) * 6000
+            + int(duration[6:8]) * 100 + int(duration[9:11]))
+
+def format_duration(centiseconds: int) -> str:
+    """Converts centiseconds to a canonical 'HH:MM:SS.hh' duration."""
+    if not isinstance(centiseconds, int):
+        raise TypeError("centiseconds must be an int")
+    if centiseconds < 0:
+        raise Exception(f"Attempted to convert invalid time to duration: {centiseconds}")
+    seconds, hundredths = divmod(centiseconds, 100)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02}:{minutes:02}:{seconds:02}.{hundredths:02}"
+
+def load_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            np = False
+    return np
+
+def parse_column(durations):
+    """Parses a whole column of canonical durations at once. Empty cells become MISSING.
+
+    Returns:
+        A NumPy int64 array for long columns when NumPy is installed, otherwise an array('q').
+    """
+    durations = list(durations)
+    numpy = load_numpy() if len(durations) >= numpy_min_column else None
+    for d in durations:
+        if d and len(d) != 11:
+            raise Exception(f"Attempted to convert duration to time, but failed: '{d}' was not of proper length")
+    if numpy:
+        out = numpy.full(len(durations), MISSING, dtype=numpy.int64)
+        present = [i for i, d in enumerate(durations) if d]
+        if present:
+            chars = numpy.array([durations[i] for i in present], dtype="U11")
+            digits = chars.view(numpy.uint32).reshape(len(present), 11).astype(numpy.int64) - ord("0")
+            weights = numpy.array([3600000, 360000, 0, 60000, 6000, 0, 1000, 100, 0, 10, 1], dtype=numpy.int64)
+            out[present] = digits @ weights
+        return out
+    return array("q", (parse_duration(d) if d else MISSING for d in durations))
+
+def format_column(centiseconds):
+    """Formats a parsed column back to durations, turning MISSING into empty cells."""
+    return [format_duration(int(cs)) if cs != MISSING else "" for cs in centiseconds]
@@ -0,0 +1,159 @@
+"""Optional SQLite store for best times, with every observed time kept as history.
+
+master_times.csv stays the export format, so existing readers such as
+relay_tools.read_times keep working. Updates are applied as small transactions
+instead of rewriting a whole file.
+"""
+import csv
+import sqlite3
+from datetime import date
+
+from time_codec import format_duration, normalize_duration, parse_duration
+
+schema = """
+CREATE TABLE IF NOT EXISTS swimmers (
+    name TEXT PRIMARY KEY,
+    division TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS swimmers_division ON swimmers(division);
+
+CREATE TABLE IF NOT EXISTS times (
+    id INTEGER PRIMARY KEY,
+    swimmer TEXT NOT NULL,
+    event TEXT NOT NULL,
+    centiseconds INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    observed_on TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS times_swimmer_event ON times(swimmer, event);
+
+CREATE TABLE IF NOT EXISTS best_times (
+    swimmer TEXT NOT NULL,
+    event TEXT NOT NULL,
+    centiseconds INTEGER NOT NULL,
+    PRIMARY KEY (swimmer, event)
+);
+"""
+
+class TimeStore:
+    def __init__(self, path: str):
+        self.db = sqlite3.connect(path)
+        self.db.executescript(schema)
+
+    def close(self):
+        self.db.close()
+
+    def is_empty(self) -> bool:
+        return self.db.execute("SELECT 1 FROM swimmers LIMIT 1").fetchone() is None
+
+    def import_sheet(self, csvData: list[list[str]], source: str):
+        """Seeds the store from a best-time sheet (header row first)."""
+        if not csvData:
+            return
+        header = csvData[0]
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO swimmers (name, division) VALUES (?, ?)",
+                [(row[0], row[1]) for row in csvData[1:] if row and row[0]],
+            )
+            observed = []
+            for row in csvData[1:]:
+                for event, cell in zip(header[2:], row[2:]):
+                    cs = parse_duration(normalize_duration(cell)) if cell else 0
+                    if cs > 0:
+                        observed.append((row[0], event, cs))
+            self._record(observed, source, date.today().isoformat(), force_write=True)
+
+    def sync_roster(self, swimmers: list[list[str]]):
+        """Makes the swimmer list match [name, division] rows. Dropped swimmers keep their history."""
+        names = {s[0] for s in swimmers}
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO swimmers (name, division) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET division = excluded.division",
+                [(s[0], s[1]) for s in swimmers],
+            )
+            stale = [(name,) for (name,) in self.db.execute("SELECT name FROM swimmers") if name not in names]
+            self.db.executemany("DELETE FROM swimmers WHERE name = ?", stale)
+            self.db.executemany("DELETE FROM best_times WHERE swimmer = ?", stale)
+
+    def add_swimmer(self, name: str, division: str):
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO swimmers (name, division) VALUES (?, ?)", (name, division))
+
+    def remove_swimmer(self, name: str):
+        with self.db:
+            self.db.execute("DELETE FROM swimmers WHERE name = ?", (name,))
+            self.db.execute("DELETE FROM best_times WHERE swimmer = ?", (name,))
+
+    def record_event(self, event: str, times: list[list[str]], source: str, force_write: bool = False, observed_on: str | None = None):
+        """Records one event's [name, time] pairs in a single transaction and updates the best times.
+
+        Times may be in any form normalize_duration accepts, e.g. '29.87' from a results page.
+        """
+        with self.db:
+            self._record(
+                [(name, event, parse_duration(normalize_duration(time))) for name, time in times],
+                source, observed_on or date.today().isoformat(), force_write,
+            )
+
+    def _record(self, observed, source, observed_on, force_write):
+        self.db.executemany(
+            "INSERT INTO times (swimmer, event, centiseconds, source, observed_on) VALUES (?, ?, ?, ?, ?)",
+            [(name, event, cs, source, observed_on) for name, event, cs in observed],
+        )
+        update = "" if force_write else " WHERE excluded.centiseconds < best_times.centiseconds"
+        self.db.executemany(
+            "INSERT INTO best_times (swimmer, event, centiseconds) VALUES (?, ?, ?) "
+            "ON CONFLICT(swimmer, event) DO UPDATE SET centiseconds = excluded.centiseconds" + update,
+            observed,
+        )
+
+    def is_latest(self, name: str, event: str, time: str, source: str) -> bool:
+        """Whether the latest time recorded from `source` for a swimmer in an event is `time`."""
+        row = self.db.execute(
+            "SELECT centiseconds FROM times WHERE swimmer = ? AND event = ? AND source = ? ORDER BY id DESC LIMIT 1",
+            (name, event, source),
+        ).fetchone()
+        return row is not None and row[0] == parse_duration(normalize_duration(time))
+
+    def restore_best(self, name: str, event: str, previous: str, source: str):
+        """Undoes the latest time recorded from `source`, putting back the previous best (or none)."""
+        with self.db:
+            self.db.execute(
+                "DELETE FROM times WHERE id = (SELECT MAX(id) FROM times WHERE swimmer = ? AND event = ? AND source = ?)",
+                (name, event, source),
+            )
+            if previous:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO best_times (swimmer, event, centiseconds) VALUES (?, ?, ?)",
+                    (name, event, parse_duration(previous)),
+                )
+            else:
+                self.db.execute("DELETE FROM best_times WHERE swimmer = ? AND event = ?", (name, event))
+
+    def history(self, name: str, event: str):
+        """Every time recorded for a swimmer in an event, oldest first, as (time, source, date)."""
+        rows = self.db.execute(
+            "SELECT centiseconds, source, observed_on FROM times WHERE swimmer = ? AND event = ? ORDER BY id",
+            (name, event),
+        )
+        return [(format_duration(cs), source, observed_on) for cs, source, observed_on in rows]
+
+    def division(self, division: str):
+        return [name for (name,) in self.db.execute("SELECT name FROM swimmers WHERE division = ? ORDER BY name", (division,))]
+
+    def export_rows(self, header: list[str]) -> list[list[str]]:
+        """Builds the best-time sheet in master_times.csv layout, sorted by name."""
+        columns = {event: i for i, event in enumerate(header)}
+        rows = {}
+        for name, division in self.db.execute("SELECT name, division FROM swimmers ORDER BY name"):
+            rows[name] = [name, division] + [''] * (len(header) - 2)
+        for name, event, cs in self.db.execute("SELECT swimmer, event, centiseconds FROM best_times"):
+            if name in rows and event in columns:
+                rows[name][columns[event]] = format_duration(cs)
+        return [list(header)] + list(rows.values())
+
+    def export_csv(self, path: str, header: list[str]):
+        with open(path, 'w', newline='') as csvfile:
+            csv.writer(csvfile).writerows(self.export_rows(header))